@@ -0,0 +1,135 @@
+# Швидкість декодування: OpenCV проти PyAV з різними потоками декодера, пропуском
+# кадрів і перевикористанням буфера. Відео — синтетичні ролики bench_pipeline, за
+# замовчуванням перекодовані в H.264 (як у камер).
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_decode --resolutions 1920x1080,3840x2160 --output decode.json
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+from fractions import Fraction
+import cv2
+from benchmarks.bench_pipeline import generate_video
+from processor.utils.decoder import DEFAULT_DECODER_SETTINGS, FrameCounter, open_video
+
+
+def transcode_h264(source, path):
+    import av
+
+    with av.open(source) as src, av.open(path, "w") as dst:
+        stream_in = src.streams.video[0]
+        rate = stream_in.average_rate
+        stream = dst.add_stream("libx264", rate=rate)
+        stream.width, stream.height, stream.pix_fmt = stream_in.width, stream_in.height, "yuv420p"
+        # Як у камер: B-кадри (режиму nonref є що пропускати) і ключовий кадр раз на 2 с
+        stream.options = {"preset": "veryfast", "bf": "2", "g": str(int(rate * 2))}
+        for index, frame in enumerate(src.decode(stream_in)):
+            # Тип кадру з вихідного відео інакше став би примусовим для кодера
+            frame.pts, frame.time_base, frame.pict_type = index, Fraction(1) / rate, 0
+            for packet in stream.encode(frame):
+                dst.mux(packet)
+        for packet in stream.encode():
+            dst.mux(packet)
+
+
+def prepare_video(workdir, width, height, fps, duration, codec):
+    raw_path = os.path.join(workdir, f"synthetic_{width}x{height}_{fps}.mp4")
+    if not os.path.exists(raw_path):
+        print(f"🎞 Генерація {raw_path}")
+        generate_video(raw_path, width, height, fps, duration)
+    if codec == "mp4v":
+        return raw_path
+    path = os.path.join(workdir, f"synthetic_{width}x{height}_{fps}_h264.mp4")
+    if not os.path.exists(path):
+        print(f"🎞 Перекодування в H.264: {path}")
+        transcode_h264(raw_path, path)
+    return path
+
+
+def decode(path, decoder, max_frames=0):
+    cap = open_video(path, decoder)
+    if not cap.isOpened():
+        raise RuntimeError(f"не вдалося відкрити {path}")
+    counter = FrameCounter(cap)
+    frame = None
+    decoded = 0
+    started = time.perf_counter()
+    while not max_frames or decoded < max_frames:
+        ret, frame = cap.read(frame if decoder["reuse_buffer"] else None)
+        if not ret:
+            break
+        counter.advance()
+        decoded += 1
+    elapsed = time.perf_counter() - started
+    cap.release()
+    # covered — кадри джерела, які покрив прохід (з пропущеними декодером)
+    return {"decoded": decoded, "covered": counter.take(), "elapsed_sec": elapsed}
+
+
+def cases(threads, with_pyav):
+    yield "opencv", dict(DEFAULT_DECODER_SETTINGS, backend="opencv", reuse_buffer=False)
+    yield "opencv reuse", dict(DEFAULT_DECODER_SETTINGS, backend="opencv", reuse_buffer=True)
+    if not with_pyav:
+        return
+    for count in threads:
+        for thread_type in ("frame", "slice"):
+            name = f"pyav {thread_type} t={count or 'auto'}"
+            yield name, dict(DEFAULT_DECODER_SETTINGS, backend="pyav", threads=count, thread_type=thread_type,
+                             reuse_buffer=False)
+    yield "pyav frame reuse", dict(DEFAULT_DECODER_SETTINGS, backend="pyav", reuse_buffer=True)
+    for skip_frames in ("nonref", "keyframes"):
+        yield f"pyav {skip_frames}", dict(
+            DEFAULT_DECODER_SETTINGS, backend="pyav", skip_frames=skip_frames, reuse_buffer=False
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк декодування OpenCV/PyAV")
+    parser.add_argument("--resolutions", default="1920x1080,3840x2160")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--duration", type=float, default=10, help="тривалість синтетичного відео, сек")
+    parser.add_argument("--codec", default="h264", choices=("h264", "mp4v"))
+    parser.add_argument("--threads", default="0,1,4", help="потоки декодера PyAV (0 — автоматично)")
+    parser.add_argument("--max-frames", type=int, default=0, help="обмежити кількість кадрів на прогін")
+    parser.add_argument("--workdir", help="папка для відео (за замовчуванням тимчасова)")
+    parser.add_argument("--output", help="зберегти результати у JSON")
+    args = parser.parse_args()
+
+    with_pyav = importlib.util.find_spec("av") is not None
+    if not with_pyav:
+        print("⚠️ PyAV не встановлено — лише OpenCV, відео без перекодування в H.264")
+    workdir = args.workdir or tempfile.mkdtemp(prefix="traffic_decode_")
+    os.makedirs(workdir, exist_ok=True)
+    threads = [int(v) for v in args.threads.split(",")]
+
+    results = []
+    for resolution in args.resolutions.split(","):
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        codec = args.codec if with_pyav else "mp4v"
+        path = prepare_video(workdir, width, height, args.fps, args.duration, codec)
+        baseline = None
+        for name, decoder in cases(threads, with_pyav):
+            result = decode(path, decoder, args.max_frames)
+            fps = result["decoded"] / result["elapsed_sec"]
+            covered_fps = result["covered"] / result["elapsed_sec"]
+            baseline = baseline or covered_fps
+            print(
+                f"{resolution:10s} {codec:5s} {name:22s} {fps:8.1f} кадр/с, покриття {covered_fps:8.1f} кадр/с "
+                f"({covered_fps / baseline:.2f}x), декодовано {result['decoded']} з {result['covered']}"
+            )
+            results.append({"resolution": resolution, "codec": codec, "case": name, "decoder": decoder,
+                            "fps": fps, "covered_fps": covered_fps, **result})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"timestamp": time.time(), "python": sys.version, "opencv": cv2.__version__, "cases": results},
+                f, indent=2, ensure_ascii=False,
+            )
+
+
+if __name__ == "__main__":
+    main()
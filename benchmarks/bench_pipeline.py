@@ -0,0 +1,291 @@
+# Наскрізний бенчмарк на синтетичних відео з моделлю-заглушкою замість YOLO. Випадок file —
+# обробка файлу, stream — конвеєр RTSP-записувача (потік захоплення, черги, перепідключення),
+# що читає той самий локальний файл; мережі й RTSP-сервера тут немає.
+# Кожен запуск іде в окремому процесі, щоб пікова RSS не змішувалась між випадками.
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_pipeline --output bench.json
+#   python -m benchmarks.bench_pipeline --output new.json --compare bench.json
+import argparse
+import copy
+import itertools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Випадок бенчмарку -> джерело TrafficProcessor
+SOURCES = {"file": "file", "stream": "rtsp"}
+
+BACKGROUND = 110
+VEHICLE_SIZES = ((0.06, 0.10), (0.08, 0.16), (0.12, 0.28))
+
+
+# Дорога з шумом і прямокутники-«машини», що перетинають лінію сканування (h // 4)
+def generate_video(path, width, height, fps, duration_sec, seed=0):
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    noise = rng.integers(-6, 7, (height, width, 3), dtype=np.int16)
+    background = np.clip(BACKGROUND + noise, 0, 255).astype(np.uint8)
+    vehicles = []
+    for frame_idx in range(int(fps * duration_sec)):
+        if rng.random() < 1.5 / fps:
+            w_frac, h_frac = VEHICLE_SIZES[rng.integers(len(VEHICLE_SIZES))]
+            w, h = int(width * w_frac), int(height * h_frac)
+            color = tuple(int(c) for c in rng.integers(0, 60, 3)) if rng.random() < 0.5 else \
+                tuple(int(c) for c in rng.integers(190, 256, 3))
+            vehicles.append([int(rng.integers(0, width - w)), -h, w, h, height / fps * rng.uniform(0.3, 0.6), color])
+        frame = background.copy()
+        for vehicle in vehicles:
+            x, y, w, h, _, color = vehicle
+            cv2.rectangle(frame, (x, int(y)), (x + w, int(y) + h), color, -1)
+            vehicle[1] += vehicle[4]
+        vehicles = [v for v in vehicles if v[1] < height]
+        writer.write(frame)
+    writer.release()
+
+
+class _Boxes:
+    def __init__(self, xyxy):
+        self.xyxy = np.array(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.cls = np.zeros(len(self.xyxy), dtype=np.float32)
+        self.conf = np.full(len(self.xyxy), 0.9, dtype=np.float32)
+
+
+class _StubResult:
+    def __init__(self, image, xyxy):
+        self.image = image
+        self.boxes = _Boxes(xyxy)
+
+    def plot(self):
+        annotated = self.image.copy()
+        for x1, y1, x2, y2 in self.boxes.xyxy.astype(int):
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), (0, 0, 255), 1)
+        return annotated
+
+
+# Заглушка з інтерфейсом YOLO: «детектує» плями, що відрізняються від фону дороги
+class StubModel:
+    names = {0: "car"}
+
+    def predict(self, source=None, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        results = []
+        for image in images:
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            mask = (cv2.absdiff(gray, np.full_like(gray, BACKGROUND)) > 40).astype(np.uint8)
+            count, _, stats, _ = cv2.connectedComponentsWithStats(mask)
+            xyxy = [
+                (x, y, x + w, y + h) for x, y, w, h, area in stats[1:count] if area >= 20
+            ]
+            results.append(_StubResult(image, xyxy))
+        return results
+
+
+def _install_probes():
+    from processor.utils import model_registry, rtsp_recorder, scanline, video_processor
+
+    model_registry._load_model = lambda model_path, device, backend=None: StubModel()
+
+    # Затримка сегмента: від готового стічованого зображення до результатів детекції
+    ready = {}
+    latencies = []
+    original_image = scanline.ScanLineAccumulator.image
+
+    def image(self):
+        stitched = original_image(self)
+        if stitched is not None:
+            ready[id(stitched)] = time.perf_counter()
+        return stitched
+
+    scanline.ScanLineAccumulator.image = image
+
+    for module in (video_processor, rtsp_recorder):
+        detect = module.detect_lines
+
+        # Затримка сегмента рахується від готовності зображення першої лінії
+        def timed_detect(model_path, images, *args, _detect=detect, **kwargs):
+            counts = _detect(model_path, images, *args, **kwargs)
+            started = [ready.pop(id(stitched), None) for _, stitched in images][0]
+            if started is not None:
+                latencies.append(time.perf_counter() - started)
+            return counts
+
+        module.detect_lines = timed_detect
+    return latencies
+
+
+def run_case(case):
+    sys.path.insert(0, ROOT)
+    latencies = _install_probes()
+    from config_manager import default_config
+    from processor.traffic_processor import TrafficProcessor
+    from processor.utils.metrics import METRICS
+
+    settings = copy.deepcopy(default_config)
+    for source in ("file", "rtsp"):
+        settings["archive"][source]["mode"] = case["archive"]
+    settings["parallel_seek"]["workers"] = case["parallel_workers"]
+    settings["metrics"]["summary"] = False
+    settings["tiling"]["enabled"] = case.get("tiling", False)
+
+    processor = TrafficProcessor(
+        video_path=case["video_path"],
+        output_folder=case["output_folder"],
+        yolo_model_path=case["model_path"],
+        segment_length_sec=case["segment_sec"],
+        screen_duration_sec=0,
+        source=SOURCES[case["source"]],
+        settings=settings,
+        log_callback=lambda message: None,
+    )
+    started = time.perf_counter()
+    results = processor.process()
+    elapsed = time.perf_counter() - started
+
+    stages = METRICS.snapshot()["stages"]
+    frames = stages.get("decode", {}).get("items", 0)
+    latencies.sort()
+    # ru_maxrss у Linux — кілобайти, у macOS — байти
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return {
+        "elapsed_sec": elapsed,
+        "frames": frames,
+        "fps": frames / elapsed if elapsed else 0.0,
+        "segments": len(results),
+        "detections": sum(sum(counts.values()) for _, counts in results),
+        "peak_rss_mb": rss_mb,
+        "segment_latency_ms": {
+            "mean": float(np.mean(latencies)) * 1000 if latencies else 0.0,
+            "p50": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+        "stages_mean_ms": {name: stage["mean_ms"] for name, stage in stages.items()},
+    }
+
+
+def _case_name(case):
+    parallel = f" parallel={case['parallel_workers']}" if case["parallel_workers"] > 1 else ""
+    tiled = " tiled" if case.get("tiling") else ""
+    return f"{case['source']} {case['resolution']}@{case['fps']} seg={case['segment_sec']}s{parallel}{tiled}"
+
+
+def run_in_subprocess(case, workdir):
+    result_path = os.path.join(workdir, "case_result.json")
+    with open(result_path + ".in", "w", encoding="utf-8") as f:
+        json.dump(case, f)
+    command = [sys.executable, "-m", "benchmarks.bench_pipeline", "--run-case", result_path + ".in", "--result", result_path]
+    completed = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "помилка"}
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {_case_name(item["case"]): item["result"] for item in json.load(f)["cases"]}
+    print(f"\nПорівняння з {baseline_path}:")
+    for item in current:
+        name = _case_name(item["case"])
+        old = baseline.get(name)
+        if not old or "error" in old or "error" in item["result"]:
+            continue
+        delta = (item["result"]["fps"] - old["fps"]) / old["fps"] * 100 if old["fps"] else 0.0
+        print(f"{name:40s} fps {old['fps']:8.1f} -> {item['result']['fps']:8.1f} ({delta:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк конвеєра на синтетичному відео")
+    parser.add_argument("--resolutions", default="640x360,1280x720")
+    parser.add_argument("--fps", default="25")
+    parser.add_argument("--segments", default="5", help="довжини сегментів, сек")
+    parser.add_argument("--duration", type=float, default=20, help="тривалість синтетичного відео, сек")
+    parser.add_argument("--sources", default="file,stream", help="file та/або stream (файл через конвеєр RTSP)")
+    parser.add_argument("--parallel", type=int, default=0, help="додатково прогнати file з parallel_seek.workers")
+    parser.add_argument("--archive", default="off", choices=("off", "full", "detections"))
+    parser.add_argument("--tiling", action="store_true", help="інференс плитками (секція tiling)")
+    parser.add_argument("--workdir", help="папка для відео та результатів (за замовчуванням тимчасова)")
+    parser.add_argument("--output", help="зберегти результати у JSON")
+    parser.add_argument("--compare", help="JSON попереднього запуску для порівняння fps")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        with open(args.run_case, encoding="utf-8") as f:
+            case = json.load(f)
+        # detect_lines друкує кожен сегмент — у бенчмарку це лише шум
+        sys.stdout = open(os.devnull, "w")
+        result = run_case(case)
+        with open(args.result, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    unknown = [source for source in args.sources.split(",") if source not in SOURCES]
+    if unknown:
+        parser.error(f"невідомі джерела: {', '.join(unknown)} (доступні: {', '.join(SOURCES)})")
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="traffic_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    model_path = os.path.join(workdir, "stub.pt")
+    open(model_path, "a").close()
+
+    cases = []
+    for resolution, fps, segment_sec in itertools.product(
+        args.resolutions.split(","), [int(v) for v in args.fps.split(",")], [float(v) for v in args.segments.split(",")]
+    ):
+        width, height = (int(v) for v in resolution.lower().split("x"))
+        video_path = os.path.join(workdir, f"synthetic_{width}x{height}_{fps}.mp4")
+        if not os.path.exists(video_path):
+            print(f"🎞 Генерація {video_path}")
+            generate_video(video_path, width, height, fps, args.duration)
+        variants = [(source, 0) for source in args.sources.split(",")]
+        if args.parallel > 1 and "file" in args.sources.split(","):
+            variants.append(("file", args.parallel))
+        for source, parallel_workers in variants:
+            cases.append({
+                "source": source,
+                "resolution": resolution,
+                "fps": fps,
+                "segment_sec": segment_sec,
+                "parallel_workers": parallel_workers,
+                "archive": args.archive,
+                "tiling": args.tiling,
+                "video_path": video_path,
+                "model_path": model_path,
+                "output_folder": os.path.join(workdir, "output"),
+            })
+
+    results = []
+    for case in cases:
+        result = run_in_subprocess(case, workdir)
+        results.append({"case": case, "result": result})
+        name = _case_name(case)
+        if "error" in result:
+            print(f"{name:40s} помилка: {result['error']}")
+        else:
+            print(
+                f"{name:40s} {result['fps']:8.1f} fps, RSS {result['peak_rss_mb']:6.1f} МБ, "
+                f"затримка сегмента {result['segment_latency_ms']['mean']:.1f} мс (макс {result['segment_latency_ms']['max']:.1f})"
+            )
+
+    if args.compare:
+        compare(results, args.compare)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {"timestamp": time.time(), "python": sys.version, "opencv": cv2.__version__, "cases": results},
+                f, indent=2, ensure_ascii=False,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Вимірює час холодного запуску CLI та імпорту процесора в окремих процесах.
+# Запуск з кореня репозиторію: python -m benchmarks.bench_startup --output startup.json
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = {
+    "cli_help": [sys.executable, "cli.py", "--help"],
+    "import_processor": [sys.executable, "-c", "import processor.traffic_processor"],
+    "heavy_modules_loaded": [
+        sys.executable, "-c",
+        "import sys, processor.traffic_processor; "
+        "heavy = [m for m in ('ultralytics', 'torch', 'pyautogui', 'PyQt5') if m in sys.modules]; "
+        "sys.exit(1 if heavy else 0)",
+    ],
+}
+
+
+def measure(command, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run(command, cwd=ROOT, capture_output=True)
+        timings.append(time.perf_counter() - started)
+        if result.returncode != 0:
+            return {"error": result.stderr.decode("utf-8", "replace").strip() or f"код {result.returncode}"}
+    return {
+        "mean_sec": statistics.mean(timings),
+        "min_sec": min(timings),
+        "max_sec": max(timings),
+        "repeat": repeat,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк часу запуску")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="зберегти результати у JSON")
+    args = parser.parse_args()
+
+    results = {name: measure(command, args.repeat) for name, command in CASES.items()}
+    for name, data in results.items():
+        if "error" in data:
+            print(f"{name:22s} помилка: {data['error']}")
+        else:
+            print(f"{name:22s} {data['mean_sec'] * 1000:8.1f} ms (min {data['min_sec'] * 1000:.1f})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": time.time(), "python": sys.version, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Порівняння пакетного стічера з попереднім порядковим циклом cv2.resize + np.vstack.
+# Запуск з кореня репозиторію: python -m benchmarks.bench_stitcher
+import argparse
+import timeit
+import cv2
+import numpy as np
+from processor.utils.stitcher import build_stitched_image
+
+
+def legacy_build_stitched_image(frames, line_y, target_width):
+    stitched_lines = []
+    for frame in frames:
+        line = frame[line_y:line_y + 1, :, :]
+        resized_line = cv2.resize(line, (target_width, 1), interpolation=cv2.INTER_AREA)
+        stitched_lines.append(resized_line)
+    return np.vstack(stitched_lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Мікробенчмарк стічера")
+    parser.add_argument("--rows", type=int, default=600)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--divisor", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, 256, (args.rows, args.width, 3), dtype=np.uint8)
+    # Для старого шляху кожен "кадр" — один рядок, щоб не міряти пам'ять повних кадрів
+    frames = [rows[i:i + 1] for i in range(args.rows)]
+    target_width = args.width // args.divisor
+
+    legacy = legacy_build_stitched_image(frames, 0, target_width)
+    batched = build_stitched_image(rows, target_width)
+    assert np.array_equal(legacy, batched), "результати стічерів відрізняються"
+
+    legacy_time = timeit.timeit(lambda: legacy_build_stitched_image(frames, 0, target_width), number=args.repeat)
+    batched_time = timeit.timeit(lambda: build_stitched_image(rows, target_width), number=args.repeat)
+
+    print(f"rows={args.rows} width={args.width} -> {target_width}")
+    print(f"legacy : {legacy_time / args.repeat * 1000:.3f} ms/segment")
+    print(f"batched: {batched_time / args.repeat * 1000:.3f} ms/segment")
+    print(f"speedup: {legacy_time / batched_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import os
+import signal
+import sys
+import time
+
+# Лише легкі модулі: cv2/ultralytics/pyautogui імпортуються тоді, коли їх потребує обране джерело
+from config_manager import CONFIG_PATH, load_config, build_rtsp_url
+
+SOURCES = ("file", "rtsp", "screen", "batch", "cameras")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Підрахунок транспорту без графічного інтерфейсу")
+    parser.add_argument("--config", default=CONFIG_PATH, help="шлях до config.yaml")
+    parser.add_argument("--source", choices=SOURCES, help="джерело відео")
+    parser.add_argument("--input", help="відеофайл, RTSP URL або папка/шаблон для batch")
+    parser.add_argument("--output", help="вихідна папка")
+    parser.add_argument("--model", help="шлях до моделі YOLO")
+    parser.add_argument("--device", help="пристрій для інференсу (cpu, 0, ...)")
+    parser.add_argument("--segment", type=int, help="довжина сегмента, сек")
+    parser.add_argument("--duration", type=int, help="тривалість запису RTSP/екрану, сек (0 — безперервно)")
+    parser.add_argument("--workers", type=int, help="кількість процесів для batch")
+    parser.add_argument(
+        "--report", type=int, metavar="SEC", help="вивести підсумки з бази результатів по вікнах SEC секунд і вийти"
+    )
+    return parser.parse_args(argv)
+
+
+def resolve_options(args, config):
+    source = args.source or config.get("source", "file")
+    if source not in SOURCES:
+        source = "file"
+
+    if args.input:
+        input_path = args.input
+    elif source == "rtsp":
+        input_path = build_rtsp_url(
+            config.get("rtsp_url", ""), config.get("rtsp_username", ""), config.get("rtsp_password", "")
+        )
+    elif source in ("screen", "cameras"):
+        input_path = source
+    else:
+        input_path = config.get("video_path", "")
+
+    if args.duration is not None:
+        duration = args.duration
+    elif source == "screen":
+        duration = config.get("screen_duration_sec", 30)
+    else:
+        duration = config.get("rtsp_duration_sec", 30)
+
+    return {
+        "source": source,
+        "video_path": input_path,
+        "output_folder": args.output or config.get("output_folder", ""),
+        "yolo_model_path": args.model or config.get("yolo_model_path", ""),
+        "device": args.device or config.get("yolo_device") or None,
+        "segment_length_sec": args.segment or config.get("segment_length_sec", 30),
+        "screen_duration_sec": duration,
+    }
+
+
+def print_segments(results):
+    for segment_idx, class_counts in results:
+        parts = [f"{cls}: {cnt}" for cls, cnt in class_counts.items()]
+        print(f"📦 Сегмент {segment_idx}: " + ", ".join(parts))
+
+
+def print_summary(summary):
+    if isinstance(summary, dict):
+        for camera, results in summary.items():
+            print(f"📷 {camera}")
+            print_segments(results)
+        return
+    print_segments(summary)
+
+
+def print_report(config, output_folder, window_sec):
+    import datetime
+    from processor.utils.results_store import ResultsQuery, results_store_path
+
+    path = results_store_path(config, output_folder)
+    if not os.path.exists(path):
+        print(f"❌ Базу результатів не знайдено: {path}")
+        return 1
+    query = ResultsQuery(path)
+    try:
+        for window, counts in query.by_window(window_sec):
+            parts = [f"{cls}: {cnt}" for cls, cnt in counts.items()]
+            print(f"🕒 {datetime.datetime.fromtimestamp(window):%Y-%m-%d %H:%M:%S}: " + ", ".join(parts))
+        parts = [f"{cls}: {cnt}" for cls, cnt in query.totals().items()]
+        print("📊 Разом: " + ", ".join(parts))
+    finally:
+        query.close()
+    return 0
+
+
+def main(argv=None):
+    started = time.perf_counter()
+    args = parse_args(argv)
+    config = load_config(args.config)
+    options = resolve_options(args, config)
+
+    if args.report:
+        if not options["output_folder"]:
+            print("❌ Не задано вихідну папку (--output)")
+            return 2
+        return print_report(config, options["output_folder"], args.report)
+
+    if options["source"] in ("file", "batch", "rtsp") and not options["video_path"]:
+        print("❌ Не задано джерело відео (--input)")
+        return 2
+    if not options["yolo_model_path"]:
+        print("❌ Не задано модель YOLO (--model)")
+        return 2
+    if not options["output_folder"]:
+        print("❌ Не задано вихідну папку (--output)")
+        return 2
+
+    stop_requested = []
+
+    def request_stop(signum, frame):
+        if stop_requested:
+            raise KeyboardInterrupt
+        stop_requested.append(signum)
+        print("⛔ Запит на зупинку... (повторне Ctrl+C перерве негайно)")
+
+    signal.signal(signal.SIGINT, request_stop)
+
+    if args.workers:
+        config.setdefault("batch", {})["workers"] = args.workers
+
+    from processor.traffic_processor import TrafficProcessor
+
+    processor = TrafficProcessor(
+        settings=config,
+        stop_callback=lambda: bool(stop_requested),
+        **options
+    )
+
+    print(f"⏱ Запуск за {time.perf_counter() - started:.2f} с")
+    summary = processor.process()
+    print("\n--- Результати ---")
+    print_summary(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,4 @@
+import copy
 import yaml
 import os
 
@@ -8,29 +9,169 @@ default_config = {
     "rtsp_url": "",
     "output_folder": "",
     "yolo_model_path": "",
+    "yolo_device": "",
     "segment_length_sec": 30,
     "screen_duration_sec": 30,
     "rtsp_duration_sec": 30,
-    "source": "file"
+    "source": "file",
+    "archive": {
+        "file": {"mode": "full", "codec": "XVID", "container": "avi"},
+        "rtsp": {"mode": "full", "codec": "XVID", "container": "avi"},
+        "screen": {"mode": "full", "codec": "XVID", "container": "avi"},
+    },
+    "artifacts": {
+        "format": "jpg",
+        "quality": 90,
+        "png_compression": 3,
+        "annotated": True,
+        "queue_size": 32,
+        "workers": 1,
+    },
+    "cameras": [],
+    "supervisor": {
+        "restart_backoff_sec": 2,
+        "max_backoff_sec": 60,
+        "stable_after_sec": 60,
+        "report_interval_sec": 30,
+    },
+    "batch": {
+        "workers": 2,
+    },
+    "decoder": {
+        "backend": "opencv",
+        "threads": 0,
+        "thread_type": "frame",
+        "skip_frames": "none",
+        "reuse_buffer": True,
+    },
+    "frame_scheduler": {
+        "enabled": True,
+        "max_lag_sec": 2.0,
+        "recover_lag_sec": 0.5,
+        "max_step": 8,
+        "adjust_interval_sec": 2.0,
+    },
+    "inference": {
+        "batch_size": 4,
+        "max_wait_ms": 50,
+        "conf": 0.3,
+        "imgsz": 640,
+    },
+    "inference_backend": {
+        "name": "auto",
+        "torch": {"threads": 0, "interop_threads": 0},
+        "onnxruntime": {
+            "intra_op_threads": 0, "inter_op_threads": 0, "execution_mode": "sequential", "graph_optimization": "all",
+        },
+        "openvino": {"device": "CPU", "threads": 0, "streams": 0, "performance_hint": "LATENCY"},
+    },
+    "metrics": {
+        "http_port": 0,
+        "json_path": "",
+        "json_interval_sec": 10,
+        "summary": True,
+    },
+    "motion_gate": {
+        "enabled": False,
+        "method": "background",
+        "pixel_threshold": 25,
+        "min_fraction": 0.02,
+        "min_active_rows": 1,
+        "background_alpha": 0.2,
+        "trim": False,
+        "trim_margin_rows": 10,
+    },
+    "parallel_seek": {
+        "workers": 0,
+    },
+    "pipeline": {
+        "capture": {"size": 64, "policy": "drop_oldest"},
+        "encode": {"size": 128, "policy": "drop_oldest"},
+        "inference": {"size": 4, "policy": "block"},
+        "stats_interval_sec": 30,
+    },
+    "results_store": {
+        "enabled": True,
+        "path": "",
+        "commit_batch": 50,
+        "commit_interval_sec": 2,
+        "queue_size": 256,
+        "max_in_memory": 1000,
+    },
+    "roi": {
+        "enabled": False,
+        "band_height": 32,
+        "preview_scale": 0.25,
+        "preview_interval_frames": 20,
+    },
+    "rtsp": {
+        "transport": "tcp",
+        "open_timeout_sec": 10,
+        "read_timeout_sec": 5,
+        "buffer_size": 1048576,
+        "max_delay_ms": 500,
+        "low_delay": True,
+        "extra_options": "",
+        "reconnect": True,
+        "backoff_sec": 1,
+        "max_backoff_sec": 30,
+        "max_reconnects": 0,
+    },
+    "scan_lines": {
+        "lines": [],
+    },
+    "screen_capture": {
+        "backend": "auto",
+        "region": None,
+        "fps": 20,
+    },
+    "segment_writer": {
+        "mode": "reencode",
+        "workers": 2,
+        "queue_size": 64,
+    },
+    "stitcher": {
+        "width": 0,
+        "width_divisor": {"file": 2, "rtsp": 16, "screen": 8},
+        "interpolation": "area",
+        "band": 1,
+    },
+    "tiling": {
+        "enabled": False,
+        "min_aspect": 2.0,
+        "tile_aspect": 1.0,
+        "overlap": 0.25,
+        "tile_imgsz": 0,
+        "merge_threshold": 0.6,
+    },
 }
 
-def load_config():
-    if not os.path.exists(CONFIG_PATH):
-        save_config(default_config)
-        return default_config.copy()
+def load_config(path=CONFIG_PATH):
+    if not os.path.exists(path):
+        save_config(default_config, path)
+        return copy.deepcopy(default_config)
     try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             config = yaml.safe_load(f)
             if config is None:
-                return default_config.copy()
+                return copy.deepcopy(default_config)
+            for key, value in default_config.items():
+                config.setdefault(key, copy.deepcopy(value))
             return config
     except Exception as e:
         print(f"⚠️ Помилка при завантаженні конфігурації: {e}")
-        return default_config.copy()
+        return copy.deepcopy(default_config)
 
-def save_config(config):
+def save_config(config, path=CONFIG_PATH):
     try:
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
+        with open(path, 'w', encoding='utf-8') as f:
             yaml.dump(config, f, allow_unicode=True)
     except Exception as e:
         print(f"⚠️ Помилка при збереженні конфігурації: {e}")
+
+
+def build_rtsp_url(url, username="", password=""):
+    if username and password and "://" in url:
+        protocol, rest = url.split("://", 1)
+        return f"{protocol}://{username}:{password}@{rest}"
+    return url
@@ -1,5 +1,6 @@
 import sys
 import subprocess
+import importlib.util
 
 required_packages = {
     'PyQt5': 'PyQt5',
@@ -8,12 +9,12 @@ required_packages = {
     'ultralytics': 'ultralytics',
     'pyyaml': 'yaml',
     'pyautogui': 'pyautogui',
+    'mss': 'mss',
 }
 
 def install_if_missing(pip_name, import_name):
-    try:
-        __import__(import_name)
-    except ImportError:
+    # find_spec лише шукає пакет, не імпортуючи важкі модулі на кожному запуску
+    if importlib.util.find_spec(import_name) is None:
         print(f"📦 Встановлення пакета: {pip_name} ...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", pip_name])
 
@@ -0,0 +1,190 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from .utils.decoder import open_video, resolve_decoder
+from .utils.inference_backends import get_inference_backend_settings
+from .utils.model_registry import get_model
+from .utils.settings import get_section
+from .utils.video_processor import process_video_file
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov")
+RESULTS_DIR = "batch_results"
+SUMMARY_FILE = "batch_summary.json"
+
+DEFAULT_BATCH_SETTINGS = {
+    "workers": 2,
+}
+
+
+def get_batch_settings(settings):
+    return get_section(settings, "batch", DEFAULT_BATCH_SETTINGS)
+
+
+def collect_video_files(pattern):
+    if os.path.isdir(pattern):
+        paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p) and p.lower().endswith(VIDEO_EXTENSIONS))
+
+
+def _result_path(output_folder, video_path):
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    # Хеш шляху розрізняє однакові імена файлів з різних папок
+    digest = hashlib.md5(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(output_folder, RESULTS_DIR, f"{name}_{digest}.json")
+
+
+def _load_result(output_folder, video_path):
+    path = _result_path(output_folder, video_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("video_path") != os.path.abspath(video_path):
+        return None
+    return data
+
+
+# Подія зупинки, спільна з головним процесом (задається в ініціалізаторі процесу)
+_stop_event = None
+
+
+def _init_worker(model_path, device, backend, stop_event):
+    global _stop_event
+    _stop_event = stop_event
+    # Кожен процес завантажує модель один раз, далі detect_and_save бере її з реєстру
+    get_model(model_path, device, backend=backend)
+
+
+# Результат пишеться лише для повністю обробленого файлу: помилка чи зупинка лишає
+# файл необробленим, і наступний запуск його повторить
+def _process_one(video_path, output_folder, model_path, segment_length_sec, device, settings):
+    name = os.path.basename(video_path)
+    cap = open_video(video_path, resolve_decoder(settings))
+    opened = cap.isOpened()
+    cap.release()
+    if not opened:
+        raise RuntimeError("не вдалося відкрити відео")
+    results = process_video_file(
+        video_path=video_path,
+        output_folder=output_folder,
+        model_path=model_path,
+        segment_length_sec=segment_length_sec,
+        device=device,
+        settings=settings,
+        log_callback=lambda message: print(f"[{name}] {message}"),
+        stop_callback=_stop_event.is_set,
+    )
+    if _stop_event.is_set():
+        return None
+    data = {
+        "video_path": os.path.abspath(video_path),
+        "segments": [[idx, counts] for idx, counts in results],
+    }
+    result_path = _result_path(output_folder, video_path)
+    tmp_path = result_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, result_path)
+    return data
+
+
+def merge_results(file_results):
+    totals = Counter()
+    files = {}
+    for data in file_results:
+        file_totals = Counter()
+        for _, counts in data["segments"]:
+            file_totals.update(counts)
+        totals.update(file_totals)
+        files[data["video_path"]] = {
+            "segments": data["segments"],
+            "totals": dict(file_totals),
+        }
+    return {"files": files, "totals": dict(totals)}
+
+
+def process_batch(
+    pattern,
+    output_folder,
+    model_path,
+    segment_length_sec,
+    workers=None,
+    device=None,
+    settings=None,
+    log_callback=None,
+    stop_callback=lambda: False
+):
+    log = log_callback or print
+    video_paths = collect_video_files(pattern)
+    if not video_paths:
+        log(f"❌ Не знайдено відеофайлів: {pattern}")
+        return []
+
+    os.makedirs(os.path.join(output_folder, RESULTS_DIR), exist_ok=True)
+    workers = workers or get_batch_settings(settings)["workers"]
+
+    done = []
+    pending = []
+    for path in video_paths:
+        data = _load_result(output_folder, path)
+        if data is not None:
+            done.append(data)
+        else:
+            pending.append(path)
+
+    log(f"📚 Пакетна обробка: {len(video_paths)} файлів, пропущено вже оброблених {len(done)}, процесів {workers}")
+
+    if pending:
+        # Зупинка перевіряється, поки файли ще обробляються: незапущені скасовуються,
+        # а запущені бачать подію і виходять, не записуючи результат
+        stop_event = multiprocessing.Event()
+        initargs = (model_path, device, get_inference_backend_settings(settings), stop_event)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs)
+        stopped = False
+        try:
+            futures = {
+                pool.submit(_process_one, path, output_folder, model_path, segment_length_sec, device, settings): path
+                for path in pending
+            }
+            running = set(futures)
+            while running:
+                finished, running = wait(running, timeout=0.5, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    path = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        log(f"❌ Помилка обробки {path}: {e}")
+                        continue
+                    if data is not None:
+                        done.append(data)
+                        log(f"✅ Оброблено: {path}")
+                if running and stop_callback():
+                    stopped = True
+                    stop_event.set()
+                    log("🛑 Пакетну обробку перервано, решту файлів буде оброблено при наступному запуску.")
+                    break
+        finally:
+            pool.shutdown(wait=not stopped, cancel_futures=stopped)
+
+    summary = merge_results(sorted(done, key=lambda data: data["video_path"]))
+    summary_path = os.path.join(output_folder, SUMMARY_FILE)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    log(f"📊 Зведення збережено: {summary_path}")
+    # Як і інші джерела, повертаємо [(номер, лічильники)] — тут номер файлу за порядком
+    results = []
+    for idx, (video_path, data) in enumerate(summary["files"].items(), start=1):
+        parts = [f"{cls}: {cnt}" for cls, cnt in data["totals"].items()]
+        log(f"🎞 {idx}. {video_path}: " + ", ".join(parts))
+        results.append((idx, data["totals"]))
+    return results
@@ -0,0 +1,164 @@
+import threading
+import time
+from config_manager import build_rtsp_url
+from .utils.rtsp_recorder import record_and_process_rtsp
+from .utils.settings import get_section
+
+DEFAULT_SUPERVISOR_SETTINGS = {
+    "restart_backoff_sec": 2,
+    "max_backoff_sec": 60,
+    "stable_after_sec": 60,
+    "report_interval_sec": 30,
+}
+
+
+def get_supervisor_settings(settings):
+    return get_section(settings, "supervisor", DEFAULT_SUPERVISOR_SETTINGS)
+
+
+def build_camera_url(camera):
+    return build_rtsp_url(camera.get("rtsp_url", ""), camera.get("username", ""), camera.get("password", ""))
+
+
+# Кожна камера записується у власному потоці; модель і сервіс інференсу спільні,
+# бо detect_lines бере їх з реєстрів процесу.
+class CameraRunner(threading.Thread):
+    def __init__(
+        self, camera, output_folder, model_path, segment_length_sec, device, settings, result_callback, log_callback,
+        stop_callback
+    ):
+        self.name_label = camera.get("name") or camera.get("rtsp_url", "camera")
+        super().__init__(name=f"camera:{self.name_label}", daemon=True)
+        self.camera = camera
+        self.output_folder = output_folder
+        self.model_path = model_path
+        self.segment_length_sec = segment_length_sec
+        self.device = device
+        self.settings = settings
+        self.supervisor_settings = get_supervisor_settings(settings)
+        self.result_callback = result_callback
+        self.log_callback = log_callback
+        self.stop_callback = stop_callback
+        self.stats = {}
+        self.restarts = 0
+        self.total_segments = 0
+        # Номери сегментів продовжуються від виданих, а не від успішно оброблених: інакше
+        # після збою детекції перезапущений запис повторив би номери файлів і рядків у базі
+        self.emitted_segments = 0
+        self.total_detections = 0
+        self.results = []
+
+    def log(self, message):
+        self.log_callback(f"[{self.name_label}] {message}")
+
+    def run(self):
+        duration = self.camera.get("duration_sec", 0)
+        backoff = self.supervisor_settings["restart_backoff_sec"]
+        # Тривалість рахується на всю сесію камери: після перезапуску пишеться лише залишок
+        session_started = time.time()
+        while not self.stop_callback():
+            remaining = 0
+            if duration > 0:
+                remaining = round(duration - (time.time() - session_started), 1)
+                if remaining <= 0:
+                    break
+            started = time.time()
+            try:
+                results = record_and_process_rtsp(
+                    rtsp_url=build_camera_url(self.camera),
+                    output_folder=self.output_folder,
+                    duration=remaining,
+                    segment_length_sec=self.segment_length_sec,
+                    model_path=self.model_path,
+                    video_name=self.name_label,
+                    device=self.device,
+                    settings=self.settings,
+                    stats=self.stats,
+                    result_callback=self.result_callback,
+                    log_callback=self.log,
+                    stop_callback=self.stop_callback,
+                    segment_offset=self.emitted_segments,
+                )
+                self.results.extend(results)
+            except Exception as e:
+                self.log(f"❌ Потік впав: {e}")
+            self.total_segments += self.stats.get("segments", 0)
+            self.emitted_segments += self.stats.get("emitted", 0)
+            self.total_detections += self.stats.get("detections", 0)
+            self.stats.update({"emitted": 0, "segments": 0, "detections": 0})
+
+            elapsed = time.time() - started
+            if self.stop_callback() or (duration > 0 and time.time() - session_started >= duration):
+                break
+
+            # Після тривалої стабільної роботи затримка перезапуску скидається
+            if elapsed >= self.supervisor_settings["stable_after_sec"]:
+                backoff = self.supervisor_settings["restart_backoff_sec"]
+            self.restarts += 1
+            self.log(f"🔁 Перезапуск через {backoff} сек (спроба {self.restarts})")
+            deadline = time.time() + backoff
+            while time.time() < deadline and not self.stop_callback():
+                time.sleep(0.2)
+            backoff = min(backoff * 2, self.supervisor_settings["max_backoff_sec"])
+
+    def report(self):
+        return {
+            "frames": self.stats.get("frames", 0),
+            "lag_sec": self.stats.get("lag_sec", 0.0),
+            "frame_step": self.stats.get("frame_step", 1),
+            "segments": self.total_segments + self.stats.get("segments", 0),
+            "detections": self.total_detections + self.stats.get("detections", 0),
+            "restarts": self.restarts,
+        }
+
+
+def run_cameras(
+    cameras,
+    output_folder,
+    model_path,
+    segment_length_sec,
+    device=None,
+    settings=None,
+    result_callback=None,
+    log_callback=None,
+    stop_callback=lambda: False
+):
+    log = log_callback or print
+    enabled = [camera for camera in cameras if camera.get("enabled", True)]
+    if not enabled:
+        log("❌ У конфігурації немає камер (cameras)")
+        return {}
+
+    runners = [
+        CameraRunner(
+            camera, output_folder, model_path, segment_length_sec, device, settings, result_callback, log, stop_callback
+        )
+        for camera in enabled
+    ]
+    log(f"📡 Запуск {len(runners)} камер")
+    for runner in runners:
+        runner.start()
+
+    report_interval = get_supervisor_settings(settings)["report_interval_sec"]
+    last_frames = {runner.name_label: 0 for runner in runners}
+    last_report = time.time()
+    while any(runner.is_alive() for runner in runners):
+        time.sleep(0.5)
+        now = time.time()
+        if not report_interval or now - last_report < report_interval:
+            continue
+        for runner in runners:
+            report = runner.report()
+            # Кадри рахуються з початку сесії, тому після перезапуску дельта може бути від'ємною
+            frames_delta = max(0, report["frames"] - last_frames[runner.name_label])
+            last_frames[runner.name_label] = report["frames"]
+            fps = frames_delta / (now - last_report)
+            log(
+                f"📷 {runner.name_label}: {fps:.1f} fps, відставання {report['lag_sec']:.1f} с, крок {report['frame_step']}, "
+                f"сегментів {report['segments']}, виявлено {report['detections']}, перезапусків {report['restarts']}"
+            )
+        last_report = now
+
+    for runner in runners:
+        runner.join()
+    return {runner.name_label: runner.results for runner in runners}
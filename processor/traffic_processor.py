@@ -1,6 +1,11 @@
 from .utils.video_processor import process_video_file
 from .utils.screen_recorder import record_and_process_screen
 from .utils.rtsp_recorder import record_and_process_rtsp
+from .utils.model_registry import get_model
+from .utils.inference_backends import get_inference_backend_settings
+from .utils.metrics import METRICS, get_metrics_settings, reset_metrics, start_metrics_exporter
+from .batch import process_batch
+from .supervisor import run_cameras
 
 
 class TrafficProcessor:
@@ -12,6 +17,10 @@ class TrafficProcessor:
         segment_length_sec,
         screen_duration_sec=None,
         source="file",
+        device=None,
+        settings=None,
+        preview_callback=None,
+        result_callback=None,
         log_callback=None,
         stop_callback=None
     ):
@@ -21,6 +30,11 @@ class TrafficProcessor:
         self.segment_length_sec = segment_length_sec
         self.screen_duration_sec = screen_duration_sec
         self.source = source
+        self.device = device
+        self.settings = settings or {}
+        self.preview_callback = preview_callback
+        # result_callback отримує словник з лічильниками кожного сегмента одразу після детекції
+        self.result_callback = result_callback
         self.log_callback = log_callback
         self.stop_callback = stop_callback or (lambda: False)
 
@@ -30,11 +44,36 @@ class TrafficProcessor:
         else:
             print(message)
 
+    def load_model(self):
+        # Модель спільна для всіх джерел і завантажується один раз до старту запису
+        return get_model(
+            self.yolo_model_path, self.device, log_callback=self.log,
+            backend=get_inference_backend_settings(self.settings),
+        )
+
     def process(self):
+        # Метрики стадій рахуються за один запуск; у batch вони лишаються у дочірніх процесах
+        reset_metrics()
+        exporter = start_metrics_exporter(self.settings, self.output_folder, log_callback=self.log)
+        try:
+            return self.process_source()
+        finally:
+            exporter.stop()
+            if get_metrics_settings(self.settings)["summary"]:
+                for line in METRICS.summary_lines():
+                    self.log(line)
+
+    def process_source(self):
+        if self.source == "batch":
+            # Процеси пакетної обробки завантажують модель самостійно
+            return self.process_batch(self.video_path)
+        self.load_model()
         if self.source == "screen":
             return self.process_screen()
         elif self.source == "rtsp":
             return self.process_rtsp()
+        elif self.source == "cameras":
+            return self.process_cameras()
         else:  # "file" or others
             return self.process_video(self.video_path)
 
@@ -44,6 +83,10 @@ class TrafficProcessor:
             duration=self.screen_duration_sec,
             segment_length_sec=self.segment_length_sec,
             model_path=self.yolo_model_path,
+            device=self.device,
+            settings=self.settings,
+            preview_callback=self.preview_callback,
+            result_callback=self.result_callback,
             log_callback=self.log,
             stop_callback=self.stop_callback
         )
@@ -56,6 +99,10 @@ class TrafficProcessor:
             duration=self.screen_duration_sec,
             segment_length_sec=self.segment_length_sec,
             model_path=self.yolo_model_path,
+            device=self.device,
+            settings=self.settings,
+            preview_callback=self.preview_callback,
+            result_callback=self.result_callback,
             log_callback=self.log,
             stop_callback=self.stop_callback
         )
@@ -67,6 +114,36 @@ class TrafficProcessor:
             output_folder=self.output_folder,
             model_path=self.yolo_model_path,
             segment_length_sec=self.segment_length_sec,
+            device=self.device,
+            settings=self.settings,
+            preview_callback=self.preview_callback,
+            result_callback=self.result_callback,
+            log_callback=self.log,
+            stop_callback=self.stop_callback
+        )
+
+    def process_batch(self, pattern, workers=None):
+        return process_batch(
+            pattern=pattern,
+            output_folder=self.output_folder,
+            model_path=self.yolo_model_path,
+            segment_length_sec=self.segment_length_sec,
+            workers=workers,
+            device=self.device,
+            settings=self.settings,
+            log_callback=self.log,
+            stop_callback=self.stop_callback
+        )
+
+    def process_cameras(self):
+        return run_cameras(
+            cameras=self.settings.get("cameras", []),
+            output_folder=self.output_folder,
+            model_path=self.yolo_model_path,
+            segment_length_sec=self.segment_length_sec,
+            device=self.device,
+            settings=self.settings,
+            result_callback=self.result_callback,
             log_callback=self.log,
             stop_callback=self.stop_callback
         )
@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+import cv2
+from .metrics import observe
+from .settings import get_section
+
+ARCHIVE_OFF = "off"
+ARCHIVE_FULL = "full"
+ARCHIVE_DETECTIONS = "detections"
+ARCHIVE_MODES = (ARCHIVE_OFF, ARCHIVE_FULL, ARCHIVE_DETECTIONS)
+
+# MJPG кодується найдешевше (кожен кадр — окремий JPEG), XVID/mp4v стискають краще
+CODECS = ("MJPG", "XVID", "mp4v", "avc1")
+CONTAINERS = ("avi", "mp4", "mkv")
+
+DEFAULT_ARCHIVE_SOURCE_SETTINGS = {
+    "mode": ARCHIVE_FULL,
+    "codec": "XVID",
+    "container": "avi",
+}
+
+DEFAULT_ARCHIVE_SETTINGS = {
+    "file": dict(DEFAULT_ARCHIVE_SOURCE_SETTINGS),
+    "rtsp": dict(DEFAULT_ARCHIVE_SOURCE_SETTINGS),
+    "screen": dict(DEFAULT_ARCHIVE_SOURCE_SETTINGS),
+}
+
+
+def get_archive_settings(settings):
+    return get_section(settings, "archive", DEFAULT_ARCHIVE_SETTINGS)
+
+
+def get_archive_config(settings, source):
+    config = get_archive_settings(settings).get(source, DEFAULT_ARCHIVE_SOURCE_SETTINGS)
+    if isinstance(config, str):
+        # Короткий запис: archive.rtsp: off
+        config = dict(DEFAULT_ARCHIVE_SOURCE_SETTINGS, mode=config)
+    else:
+        config = dict(DEFAULT_ARCHIVE_SOURCE_SETTINGS, **config)
+    if config["mode"] not in ARCHIVE_MODES:
+        raise ValueError(f"Невідомий режим архіву для {source}: {config['mode']}")
+    if config["container"] not in CONTAINERS:
+        raise ValueError(f"Непідтримуваний контейнер архіву для {source}: {config['container']}")
+    return config
+
+
+def get_archive_mode(settings, source):
+    return get_archive_config(settings, source)["mode"]
+
+
+def archive_extension(config):
+    return "." + config["container"]
+
+
+class ArchiveStats:
+    def __init__(self):
+        self.frames = 0
+        self.write_time = 0.0
+        self.bytes_written = 0
+        self.files = 0
+        self.discarded = 0
+        self._lock = threading.Lock()
+
+    def add_frame(self, elapsed):
+        with self._lock:
+            self.frames += 1
+            self.write_time += elapsed
+
+    def add_file(self, path):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock:
+            self.files += 1
+            self.bytes_written += size
+
+    def add_discarded(self, path):
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        with self._lock:
+            self.discarded += 1
+            self.bytes_written -= size
+
+    def summary(self):
+        fps = self.frames / self.write_time if self.write_time else 0.0
+        megabytes = self.bytes_written / (1024 * 1024)
+        mb_per_sec = megabytes / self.write_time if self.write_time else 0.0
+        line = (
+            f"💾 Архів: {self.files - self.discarded} файлів, {self.frames} кадрів, {megabytes:.1f} МБ, "
+            f"запис {fps:.0f} кадрів/с ({mb_per_sec:.1f} МБ/с)"
+        )
+        if self.discarded:
+            line += f", видалено сегментів без детекцій: {self.discarded}"
+        return line
+
+
+# Обгортка над cv2.VideoWriter, що рахує час запису кадрів і розмір файлу на диску
+class ArchiveWriter:
+    def __init__(self, path, codec, fps, frame_size, stats):
+        self.path = path
+        self.stats = stats
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*codec), fps, frame_size)
+        if not self._writer.isOpened():
+            raise RuntimeError(f"Не вдалося відкрити архів {path} з кодеком {codec}")
+
+    def write(self, frame):
+        started = time.perf_counter()
+        self._writer.write(frame)
+        elapsed = time.perf_counter() - started
+        self.stats.add_frame(elapsed)
+        observe("write", elapsed)
+
+    def release(self):
+        self._writer.release()
+        self.stats.add_file(self.path)
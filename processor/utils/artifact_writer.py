@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+import cv2
+from .metrics import observe
+from .pipeline import BLOCK, BoundedQueue, StageWorker
+from .settings import get_section
+
+FORMATS = ("jpg", "png", "webp")
+
+DEFAULT_ARTIFACTS_SETTINGS = {
+    "format": "jpg",
+    "quality": 90,
+    "png_compression": 3,
+    "annotated": True,
+    "queue_size": 32,
+    "workers": 1,
+}
+
+_lock = threading.Lock()
+_writers = {}
+
+
+def get_artifacts_settings(settings):
+    return get_section(settings, "artifacts", DEFAULT_ARTIFACTS_SETTINGS)
+
+
+def _encode_params(image_format, quality, png_compression):
+    if image_format == "jpg":
+        return [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    if image_format == "webp":
+        return [cv2.IMWRITE_WEBP_QUALITY, int(quality)]
+    return [cv2.IMWRITE_PNG_COMPRESSION, int(png_compression)]
+
+
+def extract_boxes(results, class_names):
+    boxes = results.boxes
+    return [
+        {"class": class_names[int(cls)], "conf": round(float(conf), 4), "xyxy": [round(float(v), 1) for v in xyxy]}
+        for cls, conf, xyxy in zip(boxes.cls.tolist(), boxes.conf.tolist(), boxes.xyxy.tolist())
+    ]
+
+
+# Зберігає original/detected у фонових потоках, щоб детекція не чекала на диск.
+# Черга блокуюча: артефакти не відкидаються, а джерело пригальмовує при переповненні.
+class ArtifactWriter:
+    def __init__(self, image_format="jpg", quality=90, png_compression=3, annotated=True, queue_size=32, workers=1):
+        if image_format not in FORMATS:
+            raise ValueError(f"Непідтримуваний формат артефактів: {image_format}")
+        self.image_format = image_format
+        self.annotated = annotated
+        self.params = _encode_params(image_format, quality, png_compression)
+        self.written = 0
+        self.errors = 0
+        self.write_time = 0.0
+        self._pending = 0
+        self._done = threading.Condition()
+        self._queue = BoundedQueue("artifacts", queue_size, BLOCK)
+        self._workers = [
+            StageWorker(f"artifacts-{i + 1}", self._queue, self._write) for i in range(max(1, workers))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, save_dir, image, results=None, boxes=None):
+        with self._done:
+            self._pending += 1
+        self._queue.put((save_dir, image, results, boxes))
+
+    def _imwrite(self, path, image):
+        started = time.perf_counter()
+        cv2.imwrite(path, image, self.params)
+        observe("imwrite", time.perf_counter() - started)
+
+    def _write(self, job):
+        save_dir, image, results, boxes = job
+        started = time.perf_counter()
+        ok = False
+        try:
+            os.makedirs(save_dir, exist_ok=True)
+            self._imwrite(os.path.join(save_dir, f"original.{self.image_format}"), image)
+            if self.annotated and results is not None:
+                plot_started = time.perf_counter()
+                annotated_image = results.plot()
+                observe("plot", time.perf_counter() - plot_started)
+                self._imwrite(os.path.join(save_dir, f"detected.{self.image_format}"), annotated_image)
+            if boxes is not None:
+                with open(os.path.join(save_dir, "boxes.json"), "w", encoding="utf-8") as f:
+                    json.dump(boxes, f, ensure_ascii=False)
+            ok = True
+        except Exception as e:
+            print(f"⚠️ Не вдалося зберегти результати у {save_dir}: {e}")
+        finally:
+            with self._done:
+                self.write_time += time.perf_counter() - started
+                if ok:
+                    self.written += 1
+                else:
+                    self.errors += 1
+                self._pending -= 1
+                self._done.notify_all()
+
+    # Чекає, доки всі поставлені в чергу артефакти будуть записані
+    def flush(self):
+        with self._done:
+            while self._pending:
+                self._done.wait()
+
+
+def get_artifact_writer(settings=None):
+    artifacts = get_artifacts_settings(settings)
+    key = (
+        artifacts["format"], artifacts["quality"], artifacts["png_compression"],
+        artifacts["annotated"], artifacts["queue_size"], artifacts["workers"],
+    )
+    with _lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = ArtifactWriter(
+                image_format=artifacts["format"],
+                quality=artifacts["quality"],
+                png_compression=artifacts["png_compression"],
+                annotated=artifacts["annotated"],
+                queue_size=artifacts["queue_size"],
+                workers=artifacts["workers"],
+            )
+            _writers[key] = writer
+        return writer
+
+
+def flush_artifacts(settings=None):
+    get_artifact_writer(settings).flush()
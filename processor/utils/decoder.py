@@ -0,0 +1,176 @@
+import importlib.util
+import cv2
+import numpy as np
+from .settings import get_section
+
+BACKENDS = ("opencv", "pyav")
+THREAD_TYPES = {"frame": "FRAME", "slice": "SLICE", "auto": "AUTO"}
+SKIP_FRAMES = {"none": "DEFAULT", "nonref": "NONREF", "keyframes": "NONKEY"}
+
+DEFAULT_DECODER_SETTINGS = {
+    "backend": "opencv",
+    "threads": 0,
+    "thread_type": "frame",
+    "skip_frames": "none",
+    "reuse_buffer": True,
+}
+
+
+def get_decoder_settings(settings):
+    return get_section(settings, "decoder", DEFAULT_DECODER_SETTINGS)
+
+
+# full_frames — кадри йдуть в архів, тож пропускати їх у декодері не можна
+def resolve_decoder(settings, full_frames=False, log_callback=None):
+    decoder = dict(get_decoder_settings(settings))
+    backend = decoder["backend"]
+    if backend == "auto":
+        backend = "pyav" if importlib.util.find_spec("av") else "opencv"
+    elif backend not in BACKENDS:
+        raise ValueError(f"Невідомий бекенд декодування: {backend}")
+    decoder["backend"] = backend
+    if decoder["skip_frames"] not in SKIP_FRAMES:
+        raise ValueError(f"Невідомий режим пропуску кадрів: {decoder['skip_frames']}")
+    if decoder["skip_frames"] != "none" and (full_frames or backend != "pyav"):
+        if log_callback:
+            reason = "архів потребує всіх кадрів" if full_frames else "підтримується лише бекендом pyav"
+            log_callback(f"⚠️ skip_frames={decoder['skip_frames']} вимкнено: {reason}")
+        decoder["skip_frames"] = "none"
+    return decoder
+
+
+def open_video(path, decoder, options=None, timeout=None, params=None):
+    if decoder["backend"] == "pyav":
+        return PyAvCapture(
+            path, decoder["threads"], decoder["thread_type"], decoder["skip_frames"], options=options, timeout=timeout
+        )
+    cap = cv2.VideoCapture()
+    if params:
+        cap.open(path, cv2.CAP_FFMPEG, params)
+    else:
+        cap.open(path)
+    return cap
+
+
+# Декодер на PyAV з інтерфейсом cv2.VideoCapture (isOpened/get/set/read/release), тож
+# підставляється у ті самі цикли й CaptureThread. На відміну від OpenCV, дозволяє задати
+# потоки декодера (frame — кадрові, slice — по слайсах) і пропуск кадрів у самому
+# декодері: nonref — без нереференсних (B-)кадрів, keyframes — лише ключові.
+class PyAvCapture:
+    def __init__(self, path, threads=0, thread_type="frame", skip_frames="none", options=None, timeout=None):
+        import av
+        from av.video.reformatter import VideoReformatter
+
+        self._error = av.error.FFmpegError
+        self.container = None
+        # Індекси (за pts) останнього прочитаного й останнього декодованого кадру джерела;
+        # після перемотки перший потрібний кадр уже декодований і чекає в _pending
+        self.index = -1
+        self._decoded = -1
+        self._pending = None
+        try:
+            self.container = av.open(path, options=options or {}, timeout=timeout)
+        except (self._error, OSError):
+            return
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = THREAD_TYPES[thread_type]
+        self.stream.codec_context.thread_count = int(threads)
+        self.stream.codec_context.skip_frame = SKIP_FRAMES[skip_frames]
+        self.fps = float(self.stream.average_rate or self.stream.guessed_rate or 0)
+        self.time_base = self.stream.time_base
+        self.start_pts = self.stream.start_time or 0
+        # Контекст swscale створюється один раз, а не для кожного кадру
+        self._reformatter = VideoReformatter()
+        self._frames = self.container.decode(self.stream)
+
+    def isOpened(self):
+        return self.container is not None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.stream.codec_context.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.stream.codec_context.height
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            if self.stream.frames:
+                return self.stream.frames
+            return int(self.container.duration / 1_000_000 * self.fps) if self.container.duration else 0
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.index + 1
+        return 0
+
+    def set(self, prop, value):
+        if prop != cv2.CAP_PROP_POS_FRAMES or not self.fps:
+            return False
+        # Перемотка на ключовий кадр перед цільовим, далі кадри до нього декодуються й відкидаються
+        target = int(value)
+        self.container.seek(self.start_pts + int(target / self.fps / self.time_base), stream=self.stream)
+        self._frames = self.container.decode(self.stream)
+        self._decoded = -1
+        while True:
+            frame = self._next()
+            if frame is None:
+                return False
+            if self._decoded >= target:
+                self._pending = frame
+                self.index = self._decoded - 1
+                return True
+
+    def _next(self):
+        try:
+            frame = next(self._frames)
+        except (StopIteration, self._error):
+            return None
+        index = self._decoded + 1
+        if frame.pts is not None:
+            index = max(index, int(round(float((frame.pts - self.start_pts) * self.time_base) * self.fps)))
+        self._decoded = index
+        return frame
+
+    # image — буфер для повторного використання (як у cv2.VideoCapture.read): рядки площини
+    # bgr24 копіюються прямо в нього (або в новий суцільний масив), без проміжного масиву;
+    # повертати треба саме результат read
+    def read(self, image=None):
+        if self.container is None:
+            return False, None
+        frame, self._pending = self._pending, None
+        if frame is None:
+            frame = self._next()
+        if frame is None:
+            return False, None
+        self.index = self._decoded
+        bgr = self._reformatter.reformat(frame, format="bgr24")
+        shape = (bgr.height, bgr.width, 3)
+        if image is None or image.shape != shape or image.dtype != np.uint8 or not image.flags.c_contiguous:
+            image = np.empty(shape, dtype=np.uint8)
+        # Рядки площини вирівняні (line_size >= width * 3), тож копіюється лише корисна частина
+        plane = bgr.planes[0]
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(bgr.height, plane.line_size)
+        np.copyto(image.reshape(bgr.height, bgr.width * 3), rows[:, :bgr.width * 3])
+        return True, image
+
+    def release(self):
+        if self.container is not None:
+            self.container.close()
+            self.container = None
+
+
+# Скільки кадрів джерела покрили прочитані кадри: з skip_frames декодер віддає не кожен,
+# а позиція CAP_PROP_POS_FRAMES показує, скільки їх минуло
+class FrameCounter:
+    def __init__(self, cap):
+        self.cap = cap
+        self.position = None
+        self.pending = 0
+
+    def advance(self):
+        position = self.cap.get(cv2.CAP_PROP_POS_FRAMES)
+        step = 1 if self.position is None or position <= self.position else int(round(position - self.position))
+        self.position = position
+        self.pending += step
+
+    def take(self):
+        covered, self.pending = self.pending, 0
+        return covered
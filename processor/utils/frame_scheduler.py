@@ -0,0 +1,79 @@
+import time
+from .settings import get_section
+
+DEFAULT_FRAME_SCHEDULER_SETTINGS = {
+    "enabled": True,
+    "max_lag_sec": 2.0,
+    "recover_lag_sec": 0.5,
+    "max_step": 8,
+    "adjust_interval_sec": 2.0,
+}
+
+
+def get_frame_scheduler_settings(settings):
+    return get_section(settings, "frame_scheduler", DEFAULT_FRAME_SCHEDULER_SETTINGS)
+
+
+# Бере кожен step-й кадр для стічованого зображення. Якщо відставання від реального
+# часу перевищує max_lag_sec, крок подвоюється (до max_step), а коли відставання
+# падає нижче recover_lag_sec — зменшується вдвічі. Між змінами — adjust_interval_sec.
+class FrameScheduler:
+    def __init__(self, max_lag_sec=2.0, recover_lag_sec=0.5, max_step=8, adjust_interval_sec=2.0, log_callback=None):
+        self.max_lag = max_lag_sec
+        self.recover_lag = recover_lag_sec
+        self.max_step = max(1, int(max_step))
+        self.adjust_interval = adjust_interval_sec
+        self.log_callback = log_callback
+        self.step = 1
+        self.sampled = 0
+        self.skipped = 0
+        self.max_seen_step = 1
+        self._counter = 0
+        self._last_adjust = time.monotonic()
+
+    @classmethod
+    def from_settings(cls, settings, log_callback=None):
+        scheduler = get_frame_scheduler_settings(settings)
+        if not scheduler["enabled"]:
+            return None
+        return cls(
+            max_lag_sec=scheduler["max_lag_sec"],
+            recover_lag_sec=scheduler["recover_lag_sec"],
+            max_step=scheduler["max_step"],
+            adjust_interval_sec=scheduler["adjust_interval_sec"],
+            log_callback=log_callback,
+        )
+
+    # Повертає кількість кадрів джерела, які покриває взятий кадр (разом із пропущеними
+    # перед ним), або 0, якщо кадр треба пропустити
+    def sample(self):
+        self._counter += 1
+        if self._counter < self.step:
+            self.skipped += 1
+            return 0
+        covered, self._counter = self._counter, 0
+        self.sampled += 1
+        return covered
+
+    def update(self, lag_sec):
+        now = time.monotonic()
+        if now - self._last_adjust < self.adjust_interval:
+            return
+        step = self.step
+        if lag_sec > self.max_lag and step < self.max_step:
+            step = min(step * 2, self.max_step)
+        elif lag_sec < self.recover_lag and step > 1:
+            step = max(1, step // 2)
+        if step == self.step:
+            return
+        self._last_adjust = now
+        if self.log_callback:
+            direction = "📉 Навантаження зросло" if step > self.step else "📈 Навантаження спало"
+            self.log_callback(f"{direction} (відставання {lag_sec:.1f} с): беремо кожен {step}-й кадр")
+        self.step = step
+        self.max_seen_step = max(self.max_seen_step, step)
+
+    def summary(self):
+        total = self.sampled + self.skipped
+        share = self.skipped / total * 100 if total else 0.0
+        return f"🎚 Пропущено кадрів: {self.skipped} з {total} ({share:.1f}%), максимальний крок {self.max_seen_step}"
@@ -0,0 +1,260 @@
+import ast
+import os
+from abc import ABC, abstractmethod
+import cv2
+import numpy as np
+import yaml
+from .settings import get_section
+
+BACKENDS = ("torch", "onnxruntime", "openvino")
+
+DEFAULT_INFERENCE_BACKEND_SETTINGS = {
+    "name": "auto",
+    "torch": {"threads": 0, "interop_threads": 0},
+    "onnxruntime": {
+        "intra_op_threads": 0, "inter_op_threads": 0, "execution_mode": "sequential", "graph_optimization": "all",
+    },
+    "openvino": {"device": "CPU", "threads": 0, "streams": 0, "performance_hint": "LATENCY"},
+}
+
+# Параметри постобробки — як у ultralytics за замовчуванням
+NMS_IOU = 0.7
+MAX_DET = 300
+LETTERBOX_COLOR = 114
+STRIDE = 32
+
+
+def get_inference_backend_settings(settings):
+    return get_section(settings, "inference_backend", DEFAULT_INFERENCE_BACKEND_SETTINGS)
+
+
+# auto: бекенд визначається за форматом моделі (.pt — torch, .onnx — ONNX Runtime,
+# папка *_openvino_model чи .xml — OpenVINO)
+def resolve_backend(model_path, name="auto"):
+    if name != "auto":
+        if name not in BACKENDS:
+            raise ValueError(f"Невідомий бекенд інференсу: {name}")
+        return name
+    if os.path.isdir(model_path) or model_path.endswith(".xml"):
+        return "openvino"
+    if model_path.endswith(".onnx"):
+        return "onnxruntime"
+    return "torch"
+
+
+def _load_torch(model_path, options):
+    # ultralytics тягне за собою torch, тому імпортується лише для цього бекенда
+    from ultralytics import YOLO
+
+    if options["threads"] or options["interop_threads"]:
+        import torch
+
+        if options["threads"]:
+            torch.set_num_threads(int(options["threads"]))
+        if options["interop_threads"]:
+            try:
+                torch.set_num_interop_threads(int(options["interop_threads"]))
+            except RuntimeError:
+                # Дозволено лише до першої паралельної операції в процесі
+                pass
+    return YOLO(model_path)
+
+
+def load_backend(model_path, device=None, backend=None):
+    backend = backend or get_inference_backend_settings(None)
+    name = resolve_backend(model_path, backend["name"])
+    if name == "torch":
+        return _load_torch(model_path, backend["torch"])
+    if name == "onnxruntime":
+        return OnnxRuntimeModel(model_path, device, backend["onnxruntime"])
+    return OpenVinoModel(model_path, backend["openvino"])
+
+
+def letterbox(image, size):
+    height, width = image.shape[:2]
+    gain = min(size[0] / height, size[1] / width)
+    resized_w, resized_h = int(round(width * gain)), int(round(height * gain))
+    pad_x, pad_y = (size[1] - resized_w) / 2, (size[0] - resized_h) / 2
+    if (resized_w, resized_h) != (width, height):
+        image = cv2.resize(image, (resized_w, resized_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    bottom, right = size[0] - resized_h - top, size[1] - resized_w - left
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(LETTERBOX_COLOR,) * 3)
+    return image, gain, (left, top)
+
+
+# BGR uint8 HxWx3 -> RGB float32 1x3xHxW у діапазоні [0, 1], як очікує експортований YOLO
+def to_blob(image):
+    return np.ascontiguousarray(image[:, :, ::-1].transpose(2, 0, 1)[None], dtype=np.float32) / 255.0
+
+
+class Boxes:
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.cls)
+
+
+# Результат з тим самим інтерфейсом, що й ultralytics Results: boxes.cls/conf/xyxy і plot()
+class Detections:
+    def __init__(self, image, names, xyxy, conf, cls):
+        self.orig_img = image
+        self.names = names
+        self.boxes = Boxes(xyxy, conf, cls)
+
+    def plot(self):
+        annotated = self.orig_img.copy()
+        thickness = max(1, round(sum(annotated.shape[:2]) / 2 * 0.003))
+        for (x1, y1, x2, y2), conf, cls in zip(self.boxes.xyxy.astype(int), self.boxes.conf, self.boxes.cls):
+            color = _color(int(cls))
+            cv2.rectangle(annotated, (x1, y1), (x2, y2), color, thickness, cv2.LINE_AA)
+            label = f"{self.names.get(int(cls), int(cls))} {conf:.2f}"
+            (text_w, text_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, thickness / 3, thickness)
+            top = max(y1, text_h + 3)
+            cv2.rectangle(annotated, (x1, top - text_h - 3), (x1 + text_w, top), color, -1, cv2.LINE_AA)
+            cv2.putText(
+                annotated, label, (x1, top - 2), cv2.FONT_HERSHEY_SIMPLEX, thickness / 3, (255, 255, 255),
+                thickness, cv2.LINE_AA,
+            )
+        return annotated
+
+
+def _color(cls):
+    rng = np.random.default_rng(cls)
+    return tuple(int(c) for c in rng.integers(0, 200, 3))
+
+
+# Вихід YOLOv8/11 після експорту: 1 x (4 + класи) x кандидати, рамки у форматі cx, cy, w, h
+def postprocess(output, image_shape, gain, pad, conf):
+    predictions = output.T
+    scores = predictions[:, 4:]
+    cls = scores.argmax(axis=1)
+    best = scores[np.arange(len(cls)), cls]
+    keep = best >= conf
+    predictions, cls, best = predictions[keep], cls[keep], best[keep]
+    if not len(best):
+        empty = np.zeros((0, 4), dtype=np.float32)
+        return empty, np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+    cx, cy, w, h = predictions[:, 0], predictions[:, 1], predictions[:, 2], predictions[:, 3]
+    xywh = np.stack([cx - w / 2, cy - h / 2, w, h], axis=1)
+    indexes = cv2.dnn.NMSBoxesBatched(xywh.tolist(), best.tolist(), cls.tolist(), conf, NMS_IOU)
+    indexes = np.array(indexes, dtype=int).reshape(-1)[:MAX_DET]
+    xyxy = np.concatenate([xywh[indexes, :2], xywh[indexes, :2] + xywh[indexes, 2:]], axis=1)
+    xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad[0]) / gain).clip(0, image_shape[1])
+    xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad[1]) / gain).clip(0, image_shape[0])
+    return xyxy.astype(np.float32), best[indexes].astype(np.float32), cls[indexes].astype(np.float32)
+
+
+def _round_to_stride(value):
+    return max(STRIDE, int(np.ceil(value / STRIDE)) * STRIDE)
+
+
+def _names_from_metadata(model_path):
+    folder = model_path if os.path.isdir(model_path) else os.path.dirname(model_path)
+    metadata_path = os.path.join(folder, "metadata.yaml")
+    if not os.path.exists(metadata_path):
+        return None
+    with open(metadata_path, "r", encoding="utf-8") as f:
+        metadata = yaml.safe_load(f) or {}
+    names = metadata.get("names")
+    return {int(k): v for k, v in names.items()} if names else None
+
+
+# Спільна частина експортованих моделей: letterbox, прогін і NMS. Якщо вхід моделі має
+# фіксований батч (звичайний експорт), зображення проганяються по одному.
+class ExportedModel(ABC):
+    def __init__(self, model_path, input_shape, names):
+        self.model_path = model_path
+        self.names = names or {}
+        batch, _, height, width = input_shape
+        self.batch = batch if isinstance(batch, int) and batch > 0 else None
+        self.input_size = (height, width) if isinstance(height, int) and isinstance(width, int) else None
+
+    # Прогін батча через рушій бекенда: blob NCHW -> список виходів по зображеннях
+    @abstractmethod
+    def _run(self, blob):
+        pass
+
+    def predict(self, source=None, conf=0.25, imgsz=640, **kwargs):
+        images = source if isinstance(source, list) else [source]
+        size = self.input_size or (_round_to_stride(imgsz), _round_to_stride(imgsz))
+        prepared = [letterbox(image, size) for image in images]
+        blobs = [to_blob(padded) for padded, _, _ in prepared]
+        step = self.batch or len(blobs)
+        outputs = []
+        for start in range(0, len(blobs), step):
+            chunk = blobs[start:start + step]
+            if len(chunk) < step and self.batch:
+                # Фіксований батч більший за залишок: доповнюємо нулями
+                chunk = chunk + [np.zeros_like(chunk[0])] * (step - len(chunk))
+            outputs.extend(self._run(np.concatenate(chunk)))
+        results = []
+        for image, (_, gain, pad), output in zip(images, prepared, outputs):
+            xyxy, scores, cls = postprocess(output, image.shape, gain, pad, conf)
+            results.append(Detections(image, self.names, xyxy, scores, cls))
+        return results
+
+
+class OnnxRuntimeModel(ExportedModel):
+    def __init__(self, model_path, device=None, options=None):
+        import onnxruntime as ort
+
+        options = options or DEFAULT_INFERENCE_BACKEND_SETTINGS["onnxruntime"]
+        session_options = ort.SessionOptions()
+        if options["intra_op_threads"]:
+            session_options.intra_op_num_threads = int(options["intra_op_threads"])
+        if options["inter_op_threads"]:
+            session_options.inter_op_num_threads = int(options["inter_op_threads"])
+        if options["execution_mode"] == "parallel":
+            session_options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+        session_options.graph_optimization_level = {
+            "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        }.get(options["graph_optimization"], ort.GraphOptimizationLevel.ORT_ENABLE_ALL)
+        providers = ["CPUExecutionProvider"]
+        if device not in (None, "", "cpu") and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        self.session = ort.InferenceSession(model_path, sess_options=session_options, providers=providers)
+        self.input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        # ultralytics записує імена класів у метадані ONNX як repr словника
+        names = ast.literal_eval(metadata["names"]) if "names" in metadata else _names_from_metadata(model_path)
+        super().__init__(model_path, self.session.get_inputs()[0].shape, names)
+
+    def _run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoModel(ExportedModel):
+    def __init__(self, model_path, options=None):
+        import openvino as ov
+
+        options = options or DEFAULT_INFERENCE_BACKEND_SETTINGS["openvino"]
+        xml_path = model_path
+        if os.path.isdir(model_path):
+            xml_path = next(
+                (os.path.join(model_path, f) for f in sorted(os.listdir(model_path)) if f.endswith(".xml")), None
+            )
+            if xml_path is None:
+                raise FileNotFoundError(f"У {model_path} немає моделі OpenVINO (*.xml)")
+        core = ov.Core()
+        model = core.read_model(xml_path)
+        config = {}
+        if options["threads"]:
+            config["INFERENCE_NUM_THREADS"] = int(options["threads"])
+        if options["streams"]:
+            config["NUM_STREAMS"] = str(options["streams"])
+        if options["performance_hint"]:
+            config["PERFORMANCE_HINT"] = options["performance_hint"]
+        self.compiled = core.compile_model(model, options["device"], config)
+        self.output = self.compiled.output(0)
+        partial_shape = model.input(0).get_partial_shape()
+        input_shape = [dim.get_length() if dim.is_static else None for dim in partial_shape]
+        super().__init__(model_path, input_shape, _names_from_metadata(xml_path))
+
+    def _run(self, blob):
+        return self.compiled(blob)[self.output]
@@ -0,0 +1,174 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from .metrics import observe
+from .inference_backends import get_inference_backend_settings
+from .model_registry import get_model
+from .settings import get_section
+from .tiling import get_tiling_settings, merge_tile_results, plan_tiles, tile_imgsz
+
+DEFAULT_INFERENCE_SETTINGS = {
+    "batch_size": 4,
+    "max_wait_ms": 50,
+    "conf": 0.3,
+    "imgsz": 640,
+}
+
+_lock = threading.Lock()
+_services = {}
+
+
+def get_inference_settings(settings):
+    return get_section(settings, "inference", DEFAULT_INFERENCE_SETTINGS)
+
+
+# Збирає зображення від кількох сегментів/джерел і проганяє їх через модель одним
+# батчем: батч відправляється, коли набрано batch_size або минуло max_wait_ms.
+# З tiling високе стічоване зображення подається плитками, що йдуть у ті самі батчі.
+class InferenceService:
+    def __init__(
+        self, model_path, device=None, batch_size=4, max_wait_ms=50, conf=0.3, imgsz=640, backend=None, tiling=None
+    ):
+        self.model_path = model_path
+        self.device = device
+        self.backend = backend
+        self.tiling = tiling if tiling and tiling["enabled"] else None
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self.conf = conf
+        self.imgsz = imgsz
+        self.batches = 0
+        self.images = 0
+        self.tiled = 0
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="inference-service", daemon=True)
+        self._thread.start()
+
+    @property
+    def model(self):
+        return get_model(self.model_path, self.device, backend=self.backend)
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def submit(self, image, imgsz=None):
+        future = Future()
+        self._requests.put((image, imgsz or self.imgsz, future))
+        return future
+
+    def predict(self, image):
+        return self.predict_many([image])[0]
+
+    # Усі зображення (і їхні плитки) ставляться в чергу разом, тож потрапляють в одні батчі
+    def predict_many(self, images):
+        pending = []
+        for image in images:
+            tiles = self._tiles(image)
+            if tiles is None:
+                pending.append((image, None, [self.submit(image)]))
+                continue
+            imgsz = tile_imgsz(tiles[0][1] - tiles[0][0], image.shape[1], self.tiling["tile_imgsz"])
+            pending.append((image, tiles, [self.submit(image[top:bottom], imgsz) for top, bottom in tiles]))
+        results = []
+        for image, tiles, futures in pending:
+            if tiles is None:
+                results.append(futures[0].result())
+                continue
+            tile_results = [future.result() for future in futures]
+            self.tiled += 1
+            results.append(merge_tile_results(image, self.names, tiles, tile_results, self.tiling["merge_threshold"]))
+        return results
+
+    def _tiles(self, image):
+        if self.tiling is None:
+            return None
+        tiles = plan_tiles(
+            image.shape[0], image.shape[1],
+            tile_aspect=self.tiling["tile_aspect"],
+            overlap=self.tiling["overlap"],
+            min_aspect=self.tiling["min_aspect"],
+        )
+        return tiles if len(tiles) > 1 else None
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    # Помилка батчу передається його future, а потік сервісу працює далі: інакше всі, хто
+    # чекає на future.result(), і воркери конвеєра зависли б назавжди
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                # Плитки й цілі зображення можуть мати різний imgsz — кожен розмір окремим викликом
+                groups = {}
+                for image, imgsz, future in batch:
+                    groups.setdefault(imgsz, []).append((image, future))
+                for imgsz, group in groups.items():
+                    self._predict(group, imgsz)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _predict(self, group, imgsz):
+        images = [image for image, _ in group]
+        started = time.perf_counter()
+        try:
+            model = self.model
+            results = model.predict(
+                source=images, save=False, verbose=False, conf=self.conf, imgsz=imgsz, device=self.device
+            )
+            observe("predict", time.perf_counter() - started, len(images))
+        except Exception as e:
+            for _, future in group:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.images += len(images)
+        for (_, future), result in zip(group, results):
+            future.set_result(result)
+
+    def average_batch(self):
+        return self.images / self.batches if self.batches else 0.0
+
+
+def get_inference_service(model_path, device=None, settings=None):
+    inference = get_inference_settings(settings)
+    backend = get_inference_backend_settings(settings)
+    tiling = get_tiling_settings(settings)
+    key = (
+        os.path.abspath(model_path), device, backend["name"],
+        inference["batch_size"], inference["max_wait_ms"], inference["conf"], inference["imgsz"],
+        tuple(sorted(tiling.items())),
+    )
+    with _lock:
+        service = _services.get(key)
+        # Сервіс, чий потік усе ж завершився, замінюється новим
+        if service is not None and not service._thread.is_alive():
+            service = None
+        if service is None:
+            service = InferenceService(
+                model_path,
+                device,
+                batch_size=inference["batch_size"],
+                max_wait_ms=inference["max_wait_ms"],
+                conf=inference["conf"],
+                imgsz=inference["imgsz"],
+                backend=backend,
+                tiling=tiling,
+            )
+            _services[key] = service
+        return service
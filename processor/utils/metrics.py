@@ -0,0 +1,217 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from .settings import get_section
+
+DEFAULT_METRICS_SETTINGS = {
+    "http_port": 0,
+    "json_path": "",
+    "json_interval_sec": 10,
+    "summary": True,
+}
+
+# Межі кошиків гістограми, сек (останній — усе, що довше)
+BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, float("inf"))
+
+# Порядок стадій у зведенні — від джерела до диску
+STAGES = ("decode", "grab", "write", "scanline", "stitch", "motion_gate", "model_load", "predict", "plot", "imwrite")
+
+
+def get_metrics_settings(settings):
+    return get_section(settings, "metrics", DEFAULT_METRICS_SETTINGS)
+
+
+class StageHistogram:
+    def __init__(self, name):
+        self.name = name
+        self.buckets = [0] * len(BUCKETS)
+        self.calls = 0
+        self.items = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds, items=1):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.calls += 1
+        self.items += items
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    # Оцінка квантиля за верхньою межею кошика
+    def quantile(self, q):
+        if not self.calls:
+            return 0.0
+        target = q * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS, self.buckets):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self, elapsed):
+        return {
+            "calls": self.calls,
+            "items": self.items,
+            "total_sec": self.total,
+            "mean_ms": self.total / self.calls * 1000 if self.calls else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "max_ms": self.max * 1000,
+            "rate_per_sec": self.items / elapsed if elapsed > 0 else 0.0,
+            "capacity_per_sec": self.items / self.total if self.total else 0.0,
+            "buckets": dict(zip([str(b) for b in BUCKETS], self.buckets)),
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = {}
+
+    def observe(self, stage, seconds, items=1):
+        with self._lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = StageHistogram(stage)
+            histogram.observe(seconds, items)
+
+    def _ordered(self):
+        def order(histogram):
+            return STAGES.index(histogram.name) if histogram.name in STAGES else len(STAGES), histogram.name
+
+        return sorted(self.stages.values(), key=order)
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = time.time() - self.started
+            return {
+                "started_at": self.started,
+                "elapsed_sec": elapsed,
+                "stages": {h.name: h.snapshot(elapsed) for h in self._ordered()},
+            }
+
+    def summary_lines(self):
+        snapshot = self.snapshot()
+        lines = []
+        for name, stage in snapshot["stages"].items():
+            lines.append(
+                f"⏱ {name}: {stage['calls']} викл., сер. {stage['mean_ms']:.2f} мс, p50 {stage['p50_ms']:.2f} мс, "
+                f"p95 {stage['p95_ms']:.2f} мс, макс {stage['max_ms']:.2f} мс, {stage['rate_per_sec']:.1f}/с "
+                f"(пропускна здатність {stage['capacity_per_sec']:.1f}/с)"
+            )
+        return lines
+
+    def prometheus_text(self):
+        with self._lock:
+            elapsed = time.time() - self.started
+            histograms = self._ordered()
+            lines = [
+                "# HELP traffic_stage_seconds Тривалість стадії обробки",
+                "# TYPE traffic_stage_seconds histogram",
+            ]
+            for h in histograms:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, h.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'traffic_stage_seconds_bucket{{stage="{h.name}",le="{le}"}} {cumulative}')
+                lines.append(f'traffic_stage_seconds_sum{{stage="{h.name}"}} {h.total}')
+                lines.append(f'traffic_stage_seconds_count{{stage="{h.name}"}} {h.calls}')
+            lines.append("# HELP traffic_stage_items_total Кількість оброблених елементів (кадрів, зображень)")
+            lines.append("# TYPE traffic_stage_items_total counter")
+            for h in histograms:
+                lines.append(f'traffic_stage_items_total{{stage="{h.name}"}} {h.items}')
+            lines.append("# TYPE traffic_uptime_seconds gauge")
+            lines.append(f"traffic_uptime_seconds {elapsed}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+def observe(stage, seconds, items=1):
+    METRICS.observe(stage, seconds, items)
+
+
+def reset_metrics():
+    METRICS.reset()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = METRICS.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# HTTP-ендпоінт у форматі Prometheus (лише localhost) і/або періодичний JSON-знімок
+class MetricsExporter:
+    def __init__(self, http_port=0, json_path="", json_interval_sec=10, log_callback=None):
+        self.json_path = json_path
+        self.json_interval = max(1, json_interval_sec)
+        self.log_callback = log_callback
+        self._server = None
+        self._stop_event = threading.Event()
+        self._threads = []
+        if http_port:
+            self._server = ThreadingHTTPServer(("127.0.0.1", int(http_port)), _MetricsHandler)
+            self._threads.append(threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True))
+            if log_callback:
+                log_callback(f"📈 Метрики: http://127.0.0.1:{self._server.server_address[1]}/metrics")
+        if json_path:
+            self._threads.append(threading.Thread(target=self._write_json_loop, name="metrics-json", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def write_json(self):
+        tmp_path = self.json_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(METRICS.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.json_path)
+
+    def _write_json_loop(self):
+        while not self._stop_event.wait(self.json_interval):
+            try:
+                self.write_json()
+            except OSError as e:
+                if self.log_callback:
+                    self.log_callback(f"⚠️ Не вдалося записати метрики у {self.json_path}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join()
+        if self.json_path:
+            self.write_json()
+
+
+def start_metrics_exporter(settings, output_folder, log_callback=None):
+    metrics = get_metrics_settings(settings)
+    json_path = metrics["json_path"]
+    if json_path and not os.path.isabs(json_path):
+        json_path = os.path.join(output_folder, json_path)
+    return MetricsExporter(metrics["http_port"], json_path, metrics["json_interval_sec"], log_callback)
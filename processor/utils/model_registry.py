@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+import numpy as np
+from .inference_backends import load_backend, resolve_backend
+from .metrics import observe
+
+# Моделі, які не використовувались довше за цей час, вивантажуються з пам'яті
+IDLE_TTL_SEC = 15 * 60
+WARMUP_SIZE = 64
+
+_lock = threading.Lock()
+_models = {}
+# Замки завантаження для кожної моделі та версії ваг, що не завантажились
+_load_locks = {}
+_failed = set()
+
+
+def _load_model(model_path, device, backend=None):
+    # Бібліотеки бекенда (torch, onnxruntime, openvino) імпортуються лише при першому завантаженні
+    started = time.perf_counter()
+    model = load_backend(model_path, device, backend)
+    # Перший прогін ініціалізує ядра/пам'ять, щоб не гальмувати перший сегмент
+    dummy = np.zeros((WARMUP_SIZE, WARMUP_SIZE, 3), dtype=np.uint8)
+    model.predict(source=dummy, save=False, verbose=False, device=device)
+    observe("model_load", time.perf_counter() - started)
+    return model
+
+
+def _evict_idle(now):
+    for key in [k for k, entry in _models.items() if now - entry["last_used"] > IDLE_TTL_SEC]:
+        del _models[key]
+
+
+def _latest(base):
+    entries = [(key[3], entry) for key, entry in _models.items() if key[:3] == base]
+    return max(entries, key=lambda item: item[0])[1] if entries else None
+
+
+# backend — секція inference_backend; модель кешується окремо для кожного бекенда.
+# Нова версія ваг вантажиться поза глобальним замком і замінює попередню лише після
+# успішного завантаження; якщо перезавантаження не вдалося, далі працює попередня.
+def get_model(model_path, device=None, log_callback=None, backend=None):
+    # Попередження без log_callback друкуються: моделлю користується й сервіс інференсу
+    log = log_callback or print
+    path = os.path.abspath(model_path)
+    backend_name = resolve_backend(path, backend["name"] if backend else "auto")
+    base = (path, device, backend_name)
+    now = time.time()
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError as e:
+        with _lock:
+            previous = _latest(base)
+        if previous is None:
+            raise
+        if not previous.get("missing"):
+            previous["missing"] = True
+            log(f"⚠️ Ваги моделі недоступні ({e}), працює попередня версія")
+        previous["last_used"] = now
+        return previous["model"]
+    key = base + (mtime,)
+
+    with _lock:
+        _evict_idle(now)
+        entry = _models.get(key)
+        if entry is not None:
+            entry["last_used"] = now
+            return entry["model"]
+        load_lock = _load_locks.setdefault(base, threading.Lock())
+
+    # Одна модель вантажиться один раз, інші джерела чекають лише на неї, а не на глобальний замок
+    with load_lock:
+        with _lock:
+            entry = _models.get(key)
+            previous = _latest(base)
+        if entry is not None:
+            entry["last_used"] = now
+            return entry["model"]
+        # Ті самі ваги (той самий mtime) вже не завантажились — повторювати немає сенсу
+        if key in _failed and previous is not None:
+            previous["last_used"] = now
+            return previous["model"]
+        if log_callback:
+            log_callback(f"🧠 Завантаження моделі: {path} ({backend_name})")
+        try:
+            model = _load_model(path, device, backend)
+        except Exception as e:
+            if previous is None:
+                raise
+            _failed.add(key)
+            log(f"⚠️ Не вдалося перезавантажити модель {path}: {e}; працює попередня версія")
+            previous["last_used"] = now
+            return previous["model"]
+        with _lock:
+            # Ваги змінились на диску — застарілі версії цієї моделі прибираються
+            for stale in [k for k in _models if k[:3] == base]:
+                del _models[stale]
+            _failed.difference_update([k for k in _failed if k[:3] == base])
+            _models[key] = {"model": model, "last_used": now}
+        return model
+
+
+def release_models():
+    with _lock:
+        _models.clear()
+        _failed.clear()
@@ -0,0 +1,124 @@
+import threading
+import time
+import numpy as np
+from .metrics import METRICS, observe
+from .settings import get_section
+
+METHODS = ("diff", "background")
+
+DEFAULT_MOTION_GATE_SETTINGS = {
+    "enabled": False,
+    "method": "background",
+    "pixel_threshold": 25,
+    "min_fraction": 0.02,
+    "min_active_rows": 1,
+    "background_alpha": 0.2,
+    "trim": False,
+    "trim_margin_rows": 10,
+}
+
+
+def get_motion_gate_settings(settings):
+    return get_section(settings, "motion_gate", DEFAULT_MOTION_GATE_SETTINGS)
+
+
+# Частка пікселів рядка, що змінились більше ніж на pixel_threshold (за найбільшим
+# каналом): diff — відносно попереднього рядка, background — відносно рядка фону.
+# Частка, а не середнє, щоб вузьке авто в широкому рядку не розчинялось у фоні.
+def row_activity(rows, pixel_threshold, background=None):
+    values = rows.astype(np.int16)
+    if background is None:
+        changed = np.zeros(values.shape[:2], dtype=bool)
+        changed[1:] = np.abs(np.diff(values, axis=0)).max(axis=2) > pixel_threshold
+    else:
+        changed = np.abs(values - background).max(axis=2) > pixel_threshold
+    return changed.mean(axis=1)
+
+
+# Стічоване зображення — ті самі рядки лінії сканування, лише стиснуті по ширині, тож
+# активність рахується прямо на ньому. Фон кожної лінії (key) — ковзне середнє медіан
+# її сегментів за запуск. Сегменти без руху не йдуть у модель, а з trim із зображення
+# вирізаються довгі неактивні проміжки (з запасом trim_margin_rows).
+class MotionGate:
+    def __init__(
+        self, method="background", pixel_threshold=25, min_fraction=0.02, min_active_rows=1, background_alpha=0.2,
+        trim=False, trim_margin_rows=10
+    ):
+        if method not in METHODS:
+            raise ValueError(f"Невідомий метод детектора руху: {method}")
+        self.method = method
+        self.pixel_threshold = pixel_threshold
+        self.min_fraction = min_fraction
+        self.min_active_rows = max(1, int(min_active_rows))
+        self.background_alpha = background_alpha
+        self.trim = trim
+        self.trim_margin = max(0, int(trim_margin_rows))
+        self.backgrounds = {}
+        self.segments = 0
+        self.skipped = 0
+        self.rows = 0
+        self.trimmed_rows = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        gate = get_motion_gate_settings(settings)
+        if not gate["enabled"]:
+            return None
+        return cls(
+            method=gate["method"],
+            pixel_threshold=gate["pixel_threshold"],
+            min_fraction=gate["min_fraction"],
+            min_active_rows=gate["min_active_rows"],
+            background_alpha=gate["background_alpha"],
+            trim=gate["trim"],
+            trim_margin_rows=gate["trim_margin_rows"],
+        )
+
+    # Повертає зображення для детекції (можливо обрізане) або None, якщо руху немає
+    def apply(self, image, key=None):
+        started = time.perf_counter()
+        background = self._update_background(image, key) if self.method == "background" else None
+        active = row_activity(image, self.pixel_threshold, background) > self.min_fraction
+        height = len(image)
+        if active.sum() < self.min_active_rows:
+            image = None
+        elif self.trim:
+            window = np.ones(2 * self.trim_margin + 1, dtype=np.int32)
+            keep = np.convolve(active.astype(np.int32), window, mode="same") > 0
+            if not keep.all():
+                image = image[keep]
+        observe("motion_gate", time.perf_counter() - started)
+        with self._lock:
+            self.segments += 1
+            self.rows += height
+            if image is None:
+                self.skipped += 1
+            else:
+                self.trimmed_rows += height - len(image)
+        return image
+
+    # Повертає фон для поточного сегмента і підмішує до нього медіану сегмента
+    def _update_background(self, image, key=None):
+        median = np.median(image, axis=0).astype(np.float32)
+        with self._lock:
+            current = self.backgrounds.get(key)
+            if current is None or current.shape != median.shape:
+                self.backgrounds[key] = median
+                return median
+            background = current.copy()
+            current += self.background_alpha * (median - current)
+        return background
+
+    def summary(self):
+        share = self.skipped / self.segments * 100 if self.segments else 0.0
+        line = f"🌙 Детектор руху: пропущено {self.skipped} з {self.segments} сегментів ({share:.1f}%)"
+        if self.trim:
+            trimmed = self.trimmed_rows / self.rows * 100 if self.rows else 0.0
+            line += f", обрізано {trimmed:.1f}% рядків"
+        # Заощаджений час оцінюється за середнім часом моделі на одне зображення
+        predict = METRICS.snapshot()["stages"].get("predict")
+        if predict and predict["items"]:
+            saved = self.skipped * predict["total_sec"] / predict["items"]
+            line += f", заощаджено ≈{saved:.1f} с інференсу"
+        return line
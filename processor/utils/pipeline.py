@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from .metrics import observe
+from .settings import get_section
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+DEFAULT_PIPELINE_SETTINGS = {
+    "capture": {"size": 64, "policy": DROP_OLDEST},
+    "encode": {"size": 128, "policy": DROP_OLDEST},
+    "inference": {"size": 4, "policy": BLOCK},
+    "stats_interval_sec": 30,
+}
+
+# Маркер закриття черги: після нього стадія завершує роботу
+CLOSED = object()
+
+
+def get_pipeline_settings(settings):
+    return get_section(settings, "pipeline", DEFAULT_PIPELINE_SETTINGS)
+
+
+class BoundedQueue:
+    def __init__(self, name, size, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Невідома політика переповнення черги {name}: {policy}")
+        self.name = name
+        self.size = max(1, int(size))
+        self.policy = policy
+        self.put_count = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._queue = queue.Queue(maxsize=self.size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, name, pipeline_settings):
+        stage = pipeline_settings[name]
+        return cls(name, stage["size"], stage["policy"])
+
+    def depth(self):
+        return self._queue.qsize()
+
+    # timeout — лише для BLOCK: скільки чекати місця, далі queue.Full
+    def put(self, item, timeout=None):
+        if self.policy == BLOCK:
+            self._queue.put(item, timeout=timeout)
+        else:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    break
+                except queue.Full:
+                    # Найстаріший елемент поступається новому, щоб джерело не чекало
+                    try:
+                        self._queue.get_nowait()
+                        with self._lock:
+                            self.dropped += 1
+                    except queue.Empty:
+                        pass
+        with self._lock:
+            self.put_count += 1
+            self.max_depth = max(self.max_depth, self._queue.qsize())
+
+    def get(self, timeout=None):
+        return self._queue.get(timeout=timeout)
+
+    def close(self):
+        self._queue.put(CLOSED)
+
+    def stats(self):
+        return f"{self.name}: {self.depth()}/{self.size} (макс {self.max_depth}), втрачено {self.dropped} з {self.put_count}"
+
+
+class StageWorker(threading.Thread):
+    def __init__(self, name, input_queue, handler, log_callback=None):
+        super().__init__(name=name, daemon=True)
+        self.input_queue = input_queue
+        self.handler = handler
+        self.log_callback = log_callback
+        self.processed = 0
+        self.errors = 0
+
+    def run(self):
+        while True:
+            item = self.input_queue.get()
+            if item is CLOSED:
+                # Повертаємо маркер у чергу для інших воркерів цієї ж стадії
+                self.input_queue.close()
+                break
+            try:
+                self.handler(item)
+            except Exception as e:
+                self.errors += 1
+                if self.log_callback:
+                    self.log_callback(f"⚠️ Помилка на стадії {self.name}: {e}")
+            self.processed += 1
+
+
+# Межі сегментів визначаються в потоці захоплення, а не в споживачах: кожен кадр
+# одразу отримує номер сегмента за покритими кадрами (з пропущеними планувальником чи
+# декодером), тож детекція й архів, що читають різні черги з різними втратами, ріжуть
+# потік в одних і тих самих місцях. Сегмент закривається, щойно покрито segment_frames.
+class SegmentClock:
+    def __init__(self, segment_frames, first_segment=1):
+        self.segment_frames = max(1, int(segment_frames))
+        self.segment_idx = first_segment
+        self.covered = 0
+        # Номер сегмента останнього кадру (для інших виходів того самого кадру)
+        self.current = first_segment
+
+    # Повертає (номер сегмента кадру, чи це останній кадр сегмента)
+    def tick(self, covered=1):
+        self.current = self.segment_idx
+        self.covered += covered
+        if self.covered < self.segment_frames:
+            return self.current, False
+        self.segment_idx += 1
+        self.covered = 0
+        return self.current, True
+
+
+# Окремий потік постійно вичитує джерело, тому сокет RTSP не простоює,
+# поки інші стадії зайняті кодуванням чи детекцією. outputs — пари (черга, перетворення),
+# де перетворення (наприклад, вирізання смуги ROI) виконується одразу після декодування.
+class CaptureThread(threading.Thread):
+    def __init__(self, cap, outputs, log_callback=None):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.outputs = outputs
+        self.log_callback = log_callback
+        self.latest = None
+        self.frames = 0
+        self.failed = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            ret, frame = self.cap.read()
+            observe("decode", time.perf_counter() - started)
+            if not ret:
+                self.failed = True
+                if self.log_callback:
+                    self.log_callback("⚠️ Не вдалося прочитати кадр з RTSP")
+                break
+            self.latest = frame
+            self.frames += 1
+            for output, transform in self.outputs:
+                # transform може повернути None — кадр цьому виходу не потрібен
+                item = frame if transform is None else transform(frame)
+                if item is not None:
+                    output.put(item)
+        for output, _ in self.outputs:
+            output.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_workers(name, input_queue, handler, count, log_callback=None):
+    count = max(1, int(count))
+    workers = [
+        StageWorker(name if count == 1 else f"{name}-{i + 1}", input_queue, handler, log_callback)
+        for i in range(count)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def format_pipeline_stats(queues, workers=()):
+    parts = [q.stats() for q in queues]
+    parts += [f"воркер {w.name}: оброблено {w.processed}, помилок {w.errors}" for w in workers]
+    return "📊 " + " | ".join(parts)
@@ -0,0 +1,348 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from .pipeline import BLOCK, CLOSED, BoundedQueue
+from .settings import get_section
+
+DEFAULT_RESULTS_STORE_SETTINGS = {
+    "enabled": True,
+    "path": "",
+    "commit_batch": 50,
+    "commit_interval_sec": 2,
+    "queue_size": 256,
+    "max_in_memory": 1000,
+}
+
+DEFAULT_DB_NAME = "results.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    segment_idx INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    start_sec REAL NOT NULL,
+    duration_sec REAL NOT NULL,
+    recorded_at REAL NOT NULL,
+    total INTEGER NOT NULL,
+    gap_sec REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS segments_started_at ON segments (started_at);
+CREATE INDEX IF NOT EXISTS segments_source ON segments (source, started_at);
+CREATE INDEX IF NOT EXISTS segments_run ON segments (run_id, segment_idx);
+CREATE TABLE IF NOT EXISTS counts (
+    segment_id INTEGER NOT NULL REFERENCES segments (id),
+    class TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS counts_segment ON counts (segment_id);
+CREATE INDEX IF NOT EXISTS counts_class ON counts (class);
+CREATE TABLE IF NOT EXISTS boxes (
+    segment_id INTEGER NOT NULL REFERENCES segments (id),
+    class TEXT NOT NULL,
+    conf REAL NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL
+);
+CREATE INDEX IF NOT EXISTS boxes_segment ON boxes (segment_id);
+CREATE TABLE IF NOT EXISTS gaps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    segment_idx INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS gaps_started_at ON gaps (started_at);
+"""
+
+# Колонки, додані після першої версії схеми: (таблиця, колонка, визначення)
+_MIGRATIONS = (
+    ("segments", "gap_sec", "REAL NOT NULL DEFAULT 0"),
+)
+
+# Маркер у черзі: зафіксувати накопичене, не чекаючи commit_interval_sec
+_FLUSH = object()
+PUT_TIMEOUT_SEC = 1.0
+
+_lock = threading.Lock()
+_stores = {}
+
+
+def get_results_store_settings(settings):
+    return get_section(settings, "results_store", DEFAULT_RESULTS_STORE_SETTINGS)
+
+
+def results_store_path(settings, output_folder):
+    return get_results_store_settings(settings)["path"] or os.path.join(output_folder, DEFAULT_DB_NAME)
+
+
+def _connect(path):
+    # Кілька процесів (batch) пишуть в одну базу: WAL дозволяє читати під час запису
+    connection = sqlite3.connect(path, timeout=30)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+# Результати сегментів дописуються у SQLite з окремого потоку: вставки збираються
+# в одну транзакцію, яка фіксується кожні commit_batch сегментів або commit_interval_sec.
+class ResultsStore:
+    def __init__(self, path, commit_batch=50, commit_interval_sec=2, queue_size=256):
+        self.path = path
+        self.commit_batch = max(1, int(commit_batch))
+        self.commit_interval = commit_interval_sec
+        self.segments = 0
+        self.commits = 0
+        self._pending = 0
+        self._dead_warned = False
+        self._done = threading.Condition()
+        self._queue = BoundedQueue("results", queue_size, BLOCK)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = _connect(path)
+        connection.executescript(_SCHEMA)
+        for table, column, definition in _MIGRATIONS:
+            columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        connection.commit()
+        connection.close()
+        self._thread = threading.Thread(target=self._run, name="results-store", daemon=True)
+        self._thread.start()
+
+    def add_segment(
+        self, source, run_id, segment_idx, started_at, start_sec, duration_sec, counts, boxes=None, gap_sec=0.0
+    ):
+        self._enqueue(
+            ("segment", (source, run_id, segment_idx, started_at, start_sec, duration_sec, counts, boxes or [], gap_sec))
+        )
+
+    # Маркер розриву потоку (перепідключення RTSP), що припав на сегмент segment_idx
+    def add_gap(self, source, run_id, segment_idx, started_at, ended_at):
+        self._enqueue(("gap", (source, run_id, segment_idx, started_at, ended_at)))
+
+    # Черга блокуюча, тож чекаємо місця порціями й перевіряємо, чи живий потік запису:
+    # якщо він зупинився, запис відкидається замість вічного очікування
+    def _put(self, record):
+        while self._thread.is_alive():
+            try:
+                self._queue.put(record, timeout=PUT_TIMEOUT_SEC)
+                return True
+            except queue.Full:
+                continue
+        if not self._dead_warned:
+            self._dead_warned = True
+            print(f"⚠️ Запис результатів у {self.path} зупинено, нові сегменти не зберігаються")
+        return False
+
+    def _enqueue(self, record):
+        with self._done:
+            self._pending += 1
+        if not self._put(record):
+            with self._done:
+                self._pending = max(0, self._pending - 1)
+                self._done.notify_all()
+
+    def _insert(self, connection, record):
+        kind, values = record
+        if kind == "gap":
+            connection.execute(
+                "INSERT INTO gaps (source, run_id, segment_idx, started_at, ended_at) VALUES (?, ?, ?, ?, ?)", values
+            )
+            return
+        source, run_id, segment_idx, started_at, start_sec, duration_sec, counts, boxes, gap_sec = values
+        cursor = connection.execute(
+            "INSERT INTO segments"
+            " (source, run_id, segment_idx, started_at, start_sec, duration_sec, recorded_at, total, gap_sec)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                source, run_id, segment_idx, started_at, start_sec, duration_sec, time.time(), sum(counts.values()),
+                gap_sec,
+            ),
+        )
+        segment_id = cursor.lastrowid
+        connection.executemany(
+            "INSERT INTO counts (segment_id, class, count) VALUES (?, ?, ?)",
+            [(segment_id, cls, count) for cls, count in counts.items()],
+        )
+        connection.executemany(
+            "INSERT INTO boxes (segment_id, class, conf, x1, y1, x2, y2) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(segment_id, box["class"], box["conf"], *box["xyxy"]) for box in boxes],
+        )
+
+    def _commit(self, connection, count):
+        if not count:
+            return
+        try:
+            connection.commit()
+            self.commits += 1
+        except Exception as e:
+            print(f"⚠️ Не вдалося зберегти результати у {self.path}: {e}")
+        with self._done:
+            self.segments += count
+            self._pending -= count
+            self._done.notify_all()
+
+    # Будь-яка помилка потоку запису знімає очікування з flush(), інакше обробка зависла б
+    def _run(self):
+        try:
+            self._write_loop()
+        except Exception as e:
+            print(f"❌ Запис результатів у {self.path} зупинено: {e}")
+        finally:
+            with self._done:
+                self._pending = 0
+                self._done.notify_all()
+
+    def _write_loop(self):
+        connection = _connect(self.path)
+        uncommitted = 0
+        last_commit = time.monotonic()
+        while True:
+            timeout = max(0.0, self.commit_interval - (time.monotonic() - last_commit)) if uncommitted else None
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = None
+            if record is CLOSED:
+                break
+            if record is _FLUSH:
+                self._commit(connection, uncommitted)
+                uncommitted = 0
+                last_commit = time.monotonic()
+                continue
+            if record is not None:
+                try:
+                    self._insert(connection, record)
+                except Exception as e:
+                    print(f"⚠️ Не вдалося записати сегмент у {self.path}: {e}")
+                uncommitted += 1
+            if uncommitted >= self.commit_batch or (uncommitted and time.monotonic() - last_commit >= self.commit_interval):
+                self._commit(connection, uncommitted)
+                uncommitted = 0
+                last_commit = time.monotonic()
+        self._commit(connection, uncommitted)
+        connection.close()
+
+    # Чекає, доки всі додані сегменти будуть зафіксовані в базі
+    def flush(self):
+        if not self._put(_FLUSH):
+            return
+        with self._done:
+            while self._pending and self._thread.is_alive():
+                self._done.wait(timeout=1)
+
+    def close(self):
+        self.flush()
+        if self._thread.is_alive():
+            self._queue.close()
+        self._thread.join()
+
+
+def get_results_store(settings, output_folder):
+    store_settings = get_results_store_settings(settings)
+    if not store_settings["enabled"]:
+        return None
+    path = os.path.abspath(results_store_path(settings, output_folder))
+    with _lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ResultsStore(
+                path,
+                commit_batch=store_settings["commit_batch"],
+                commit_interval_sec=store_settings["commit_interval_sec"],
+                queue_size=store_settings["queue_size"],
+            )
+            _stores[path] = store
+        return store
+
+
+def _filters(start=None, end=None, source=None, run_id=None):
+    clauses = []
+    params = []
+    if start is not None:
+        clauses.append("s.started_at >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("s.started_at < ?")
+        params.append(end)
+    if source is not None:
+        clauses.append("s.source = ?")
+        params.append(source)
+    if run_id is not None:
+        clauses.append("s.run_id = ?")
+        params.append(run_id)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+# Читання бази без потоку запису: агрегації за класами і часовими вікнами
+class ResultsQuery:
+    def __init__(self, path):
+        self.path = path
+        self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+
+    def close(self):
+        self._connection.close()
+
+    def sources(self):
+        return [row[0] for row in self._connection.execute("SELECT DISTINCT source FROM segments ORDER BY source")]
+
+    def totals(self, start=None, end=None, source=None, run_id=None):
+        where, params = _filters(start, end, source, run_id)
+        rows = self._connection.execute(
+            f"SELECT c.class, SUM(c.count) FROM counts c JOIN segments s ON s.id = c.segment_id{where}"
+            " GROUP BY c.class ORDER BY c.class",
+            params,
+        )
+        return dict(rows.fetchall())
+
+    def by_window(self, window_sec, start=None, end=None, source=None, class_name=None, run_id=None):
+        where, params = _filters(start, end, source, run_id)
+        if class_name is not None:
+            where += (" AND " if where else " WHERE ") + "c.class = ?"
+            params.append(class_name)
+        rows = self._connection.execute(
+            "SELECT CAST(s.started_at / ? AS INTEGER) * ? AS window, c.class, SUM(c.count)"
+            f" FROM counts c JOIN segments s ON s.id = c.segment_id{where}"
+            " GROUP BY window, c.class ORDER BY window, c.class",
+            [window_sec, window_sec] + params,
+        )
+        windows = {}
+        for window, cls, count in rows:
+            windows.setdefault(window, {})[cls] = count
+        return sorted(windows.items())
+
+    def segments(self, start=None, end=None, source=None, run_id=None, limit=100):
+        where, params = _filters(start, end, source, run_id)
+        rows = self._connection.execute(
+            "SELECT s.id, s.source, s.run_id, s.segment_idx, s.started_at, s.duration_sec, s.total, s.gap_sec"
+            f" FROM segments s{where} ORDER BY s.started_at DESC LIMIT ?",
+            params + [limit],
+        )
+        columns = ("id", "source", "run_id", "segment_idx", "started_at", "duration_sec", "total", "gap_sec")
+        result = []
+        for row in rows:
+            segment = dict(zip(columns, row))
+            segment["counts"] = dict(
+                self._connection.execute("SELECT class, count FROM counts WHERE segment_id = ?", (segment["id"],))
+            )
+            result.append(segment)
+        return result
+
+    def boxes(self, segment_id):
+        rows = self._connection.execute(
+            "SELECT class, conf, x1, y1, x2, y2 FROM boxes WHERE segment_id = ?", (segment_id,)
+        )
+        return [{"class": cls, "conf": conf, "xyxy": [x1, y1, x2, y2]} for cls, conf, x1, y1, x2, y2 in rows]
+
+    def gaps(self, start=None, end=None, source=None, run_id=None):
+        where, params = _filters(start, end, source, run_id)
+        rows = self._connection.execute(
+            f"SELECT s.source, s.run_id, s.segment_idx, s.started_at, s.ended_at FROM gaps s{where}"
+            " ORDER BY s.started_at",
+            params,
+        )
+        columns = ("source", "run_id", "segment_idx", "started_at", "ended_at")
+        return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,56 @@
+import cv2
+from .settings import get_section
+
+DEFAULT_ROI_SETTINGS = {
+    "enabled": False,
+    "band_height": 32,
+    "preview_scale": 0.25,
+    "preview_interval_frames": 20,
+}
+
+
+def get_roi_settings(settings):
+    return get_section(settings, "roi", DEFAULT_ROI_SETTINGS)
+
+
+# line_bottom — нижня з ліній сканування: смуга покриває всі лінії від line_y до неї
+def band_bounds(frame_height, line_y, band_height, line_bottom=None):
+    band_height = max(1, int(band_height))
+    extent = 0 if line_bottom is None else line_bottom - line_y
+    height = min(band_height + extent, frame_height)
+    top = min(max(0, line_y - band_height // 2), frame_height - height)
+    return top, top + height
+
+
+# Вирізає горизонтальну смугу навколо line_y одразу після декодування, щоб далі
+# по конвеєру (черги, акумулятор, прев'ю) передавалась лише вона, а не повний кадр.
+class RoiCropper:
+    def __init__(
+        self, frame_height, line_y, band_height, preview_scale=0.25, preview_interval_frames=20, line_bottom=None
+    ):
+        self.top, self.bottom = band_bounds(frame_height, line_y, band_height, line_bottom)
+        self.line_y = line_y - self.top
+        self.height = self.bottom - self.top
+        self.preview_scale = preview_scale
+        self.preview_interval_frames = max(1, int(preview_interval_frames))
+        self._frames = 0
+
+    @classmethod
+    def from_settings(cls, frame_height, line_y, settings, line_bottom=None):
+        roi = get_roi_settings(settings)
+        if not roi["enabled"]:
+            return None
+        return cls(
+            frame_height, line_y, roi["band_height"], roi["preview_scale"], roi["preview_interval_frames"], line_bottom
+        )
+
+    def crop(self, frame):
+        # Копія звільняє повний кадр декодера одразу, а не коли смуга покине чергу
+        # (зріз суцільного кадру — теж суцільний, тож ascontiguousarray не копіював би)
+        return frame[self.top:self.bottom].copy()
+
+    def preview(self, band):
+        self._frames += 1
+        if self._frames % self.preview_interval_frames:
+            return None
+        return cv2.resize(band, None, fx=self.preview_scale, fy=self.preview_scale, interpolation=cv2.INTER_AREA)
@@ -1,22 +1,26 @@
 import cv2
-import numpy as np
 import os
+import queue
+import threading
 import time
+from collections import deque
 from datetime import datetime
-from .yolo_utils import detect_and_save
-
-
-def build_stitched_image(frames, line_y):
-    if not frames:
-        return None
-    original_width = frames[0].shape[1]
-    target_width = original_width // 16
-    stitched_lines = []
-    for frame in frames:
-        line = frame[line_y:line_y + 1, :, :]
-        resized_line = cv2.resize(line, (target_width, 1), interpolation=cv2.INTER_AREA)
-        stitched_lines.append(resized_line)
-    return np.vstack(stitched_lines)
+from .yolo_utils import detect_lines
+from .artifact_writer import flush_artifacts
+from .results_store import get_results_store, get_results_store_settings
+from .scanline import ScanLines, create_accumulator
+from .motion_gate import MotionGate
+from .frame_scheduler import FrameScheduler
+from .roi import RoiCropper
+from .archive import ARCHIVE_OFF, get_archive_config
+from .segment_writer import StreamArchive
+from .rtsp_source import ReconnectingCapture
+from .decoder import FrameCounter
+from .inference_service import get_inference_settings
+from .pipeline import (
+    CLOSED, BoundedQueue, CaptureThread, SegmentClock, StageWorker, format_pipeline_stats, get_pipeline_settings,
+    start_workers,
+)
 
 
 def record_and_process_rtsp(
@@ -26,84 +30,269 @@ def record_and_process_rtsp(
     segment_length_sec,
     model_path,
     video_name="rtsp_capture",
+    device=None,
+    settings=None,
+    stats=None,
+    preview_callback=None,
+    result_callback=None,
     log_callback=None,
-    stop_callback=lambda: False
+    stop_callback=lambda: False,
+    segment_offset=0
 ):
+    # stats — необов'язковий словник, який оновлюється під час запису (для супервізора камер):
+    # emitted — сегменти, віддані на детекцію, segments — ті, що її пройшли;
+    # segment_offset — скільки сегментів уже видано до перезапуску, нумерація продовжується
+    stats = stats if stats is not None else {}
+    stats.update({
+        "frames": 0, "emitted": 0, "segments": 0, "detections": 0, "lag_sec": 0.0, "fps": 0.0, "reconnects": 0,
+        "gap_sec": 0.0, "frame_step": 1,
+    })
+    stats_lock = threading.Lock()
+
     if not rtsp_url:
         if log_callback:
             log_callback("❌ RTSP URL не задано!")
         return []
 
-    cap = cv2.VideoCapture()
-    if not cap.open(rtsp_url, cv2.CAP_FFMPEG):
+    # Розриви, що сталися під час поточного сегмента: (початок, кінець)
+    gaps = []
+    gaps_lock = threading.Lock()
+
+    def on_gap(gap_started, gap_ended):
+        with gaps_lock:
+            gaps.append((gap_started, gap_ended))
+        stats["reconnects"] += 1
+        stats["gap_sec"] += gap_ended - gap_started
+
+    def take_gaps():
+        with gaps_lock:
+            taken = list(gaps)
+            gaps.clear()
+        return taken
+
+    archive_config = get_archive_config(settings, "rtsp")
+    cap = ReconnectingCapture(
+        rtsp_url, settings, log_callback, stop_callback, on_gap, full_frames=archive_config["mode"] != ARCHIVE_OFF
+    )
+    if not cap.isOpened():
         if log_callback:
             log_callback(f"❌ Не вдалося відкрити RTSP потік: {rtsp_url}")
         return []
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    if fps <= 0 or fps > 120:
-        fps = 20
+    # Захоплення звільняється й тоді, коли налаштування (архів, лінії) кинуло виняток,
+    # інакше кожен перезапуск камери залишав би відкрите з'єднання
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if fps <= 0 or fps > 120:
+            fps = 20
 
-    segment_frames = int(segment_length_sec * fps)
-    video_name_base = f"{video_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    segment_dir = os.path.join(output_folder, video_name_base)
-    full_video_path = os.path.join(segment_dir, f"{video_name_base}.avi")
-    os.makedirs(segment_dir, exist_ok=True)
+        stats["fps"] = fps
+        segment_frames = int(segment_length_sec * fps)
+        video_name_base = f"{video_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        segment_dir = os.path.join(output_folder, video_name_base)
+        os.makedirs(segment_dir, exist_ok=True)
 
-    fourcc = cv2.VideoWriter_fourcc(*"XVID")
-    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    video_writer = cv2.VideoWriter(full_video_path, fourcc, fps, (width, height))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        archive = None
+        if archive_config["mode"] != ARCHIVE_OFF:
+            archive = StreamArchive(
+                archive_config, os.path.join(segment_dir, video_name_base), fps, (width, height), settings,
+                log_callback,
+                first_segment=segment_offset + 1,
+            )
 
-    buffer = []
-    segment_idx = 1
-    line_y = height // 4
-    all_results = []
+        segment_idx = segment_offset + 1
+        scan_lines = ScanLines.from_settings(settings, width, height)
+        cropper = RoiCropper.from_settings(height, scan_lines.top, settings, scan_lines.bottom)
+        accumulator = create_accumulator(
+            segment_frames, scan_lines.shifted(cropper.top if cropper else 0), "rtsp", settings, row_rate=fps
+        )
+        scheduler = FrameScheduler.from_settings(settings, log_callback)
+        store = get_results_store(settings, output_folder)
+        motion_gate = MotionGate.from_settings(settings)
+        if store is not None and duration == 0:
+            # Безперервний запис: повна історія вже в базі, у пам'яті лише останні сегменти
+            all_results = deque(maxlen=get_results_store_settings(settings)["max_in_memory"])
+        else:
+            all_results = []
 
-    if log_callback:
-        msg = f"⏺ Безперервний запис RTSP..." if duration == 0 else f"⏺ Запис RTSP потоку на {duration} сек..."
-        log_callback(msg)
+        # Повні кадри потрібні лише архіву; решта конвеєра отримує смугу ROI
+        pipeline_settings = get_pipeline_settings(settings)
+        frame_queue = BoundedQueue.from_settings("capture", pipeline_settings)
+        inference_queue = BoundedQueue.from_settings("inference", pipeline_settings)
 
-    start_time = time.time()
+        # Час захоплення фіксується одразу після декодування; пропущені планувальником чи
+        # декодером кадри до черги не потрапляють, але враховуються в тривалості сегмента.
+        # Номер сегмента кадру ставить SegmentClock тут, у потоці захоплення; sample — перший
+        # вихід, тож для архіву clock.current уже відповідає цьому ж кадру
+        counter = FrameCounter(cap)
+        clock = SegmentClock(segment_frames, segment_offset + 1)
 
-    while True:
-        if stop_callback():
-            if log_callback:
-                log_callback("🛑 Запис RTSP перервано.")
-            break
+        def sample(frame):
+            pending = counter.pending
+            counter.advance()
+            frame_segment, last = clock.tick(counter.pending - pending)
+            if scheduler and not scheduler.sample():
+                return None
+            return frame_segment, last, time.time(), counter.take(), cropper.crop(frame) if cropper else frame
 
-        if duration > 0 and (time.time() - start_time >= duration):
-            break
+        def tag(frame):
+            return clock.current, frame
 
-        ret, frame = cap.read()
-        if not ret:
-            if log_callback:
-                log_callback("⚠️ Не вдалося прочитати кадр з RTSP")
-            break
+        outputs = [(frame_queue, sample)]
+        queues = [frame_queue, inference_queue]
+        workers = []
+        if archive:
+            encode_queue = BoundedQueue.from_settings("encode", pipeline_settings)
+            outputs.append((encode_queue, tag))
+            queues.insert(1, encode_queue)
+            workers.append(
+                StageWorker("encode", encode_queue, lambda item: archive.write(item[1], item[0]), log_callback)
+            )
 
-        video_writer.write(frame)
-        buffer.append(frame)
+        def run_inference(job):
+            job_idx, line_images, started_at, frame_count, segment_gaps = job
+            segment_info = {
+                "source": video_name,
+                "run_id": video_name_base,
+                "started_at": started_at,
+                "start_sec": started_at - start_time,
+                "duration_sec": frame_count / fps,
+                "gap_sec": sum(gap_ended - gap_started for gap_started, gap_ended in segment_gaps),
+            }
+            if store is not None:
+                for gap_started, gap_ended in segment_gaps:
+                    store.add_gap(video_name, video_name_base, job_idx, gap_started, gap_ended)
+            class_counts = detect_lines(
+                model_path, line_images, segment_dir, video_name_base + ".avi", job_idx, device=device,
+                settings=settings, store=store, segment_info=segment_info, motion_gate=motion_gate
+            )
+            all_results.append((job_idx, class_counts))
+            if result_callback:
+                result_callback(dict(segment_info, segment_idx=job_idx, counts=class_counts))
+            if archive:
+                archive.segment_done(job_idx, class_counts)
+            # Воркерів інференсу кілька, тож лічильники оновлюються під замком
+            with stats_lock:
+                stats["segments"] += 1
+                stats["detections"] += sum(class_counts.values())
 
-        if len(buffer) == segment_frames:
+        def emit_segment(label="сегмента"):
             if log_callback:
-                log_callback(f"🧪 Обробка сегмента {segment_idx}")
-            stitched_img = build_stitched_image(buffer, line_y)
-            class_counts = detect_and_save(model_path, stitched_img, segment_dir, video_name_base + ".avi", segment_idx)
-            all_results.append((segment_idx, class_counts))
-            buffer.clear()
-            segment_idx += 1
+                log_callback(f"🧪 Обробка {label} {segment_idx}")
+            inference_queue.put(
+                (segment_idx, accumulator.image(), accumulator.started_at(), accumulator.frames, take_gaps())
+            )
+            stats["emitted"] += 1
+            accumulator.reset()
+
+        # Сегменти, жоден кадр яких не дійшов до детекції: у режимі detections кліп без
+        # аналізу не зберігається
+        def discard_unanalysed(first, end):
+            if archive:
+                for skipped in range(first, end):
+                    archive.segment_done(skipped, {})
+
+        capture = CaptureThread(cap, outputs, log_callback)
 
-    if buffer:
         if log_callback:
-            log_callback(f"🧪 Обробка останнього сегмента {segment_idx}")
-        stitched_img = build_stitched_image(buffer, line_y)
-        class_counts = detect_and_save(model_path, stitched_img, segment_dir, video_name_base + ".avi", segment_idx)
-        all_results.append((segment_idx, class_counts))
+            msg = f"⏺ Безперервний запис RTSP..." if duration == 0 else f"⏺ Запис RTSP потоку на {duration} сек..."
+            log_callback(msg)
+
+        capture_closed = False
+        start_time = time.time()
+        last_stats_time = start_time
+        stats_interval = pipeline_settings["stats_interval_sec"]
+        for worker in workers:
+            worker.start()
+        # Кілька воркерів дозволяють сервісу інференсу збирати сегменти в батчі
+        workers += start_workers(
+            "inference", inference_queue, run_inference, get_inference_settings(settings)["batch_size"], log_callback
+        )
+        capture.start()
 
-    cap.release()
-    video_writer.release()
+        while True:
+            if stop_callback():
+                if log_callback:
+                    log_callback("🛑 Запис RTSP перервано.")
+                break
 
-    if log_callback:
-        log_callback(f"✅ RTSP запис завершено: {full_video_path}")
+            now = time.time()
+            if duration > 0 and (now - start_time >= duration):
+                break
+
+            if log_callback and stats_interval and now - last_stats_time >= stats_interval:
+                log_callback(format_pipeline_stats(queues, workers))
+                last_stats_time = now
+
+            try:
+                item = frame_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is CLOSED:
+                capture_closed = True
+                break
+            frame_segment, last, captured_at, covered, frame = item
+            # Останній кадр попереднього сегмента міг загубитись у переповненій черзі
+            if frame_segment != segment_idx:
+                if len(accumulator):
+                    emit_segment()
+                    segment_idx += 1
+                discard_unanalysed(segment_idx, frame_segment)
+                segment_idx = frame_segment
+            stats["frames"] += covered
+            # Відставання — скільки секунд минуло від декодування кадру до його обробки
+            stats["lag_sec"] = time.time() - captured_at
+            if scheduler:
+                scheduler.update(stats["lag_sec"])
+                stats["frame_step"] = scheduler.step
+
+            if preview_callback and cropper:
+                preview = cropper.preview(frame)
+                if preview is not None:
+                    preview_callback(preview)
+
+            accumulator.add(frame, captured_at, covered)
+            if last:
+                emit_segment()
+                segment_idx += 1
+
+        # Зупиняємо захоплення і вичитуємо чергу, щоб потік не завис на блокуючому put
+        capture.stop()
+        cap.interrupt()
+        while not capture_closed:
+            capture_closed = frame_queue.get() is CLOSED
+        capture.join()
+
+        if len(accumulator):
+            emit_segment("останнього сегмента")
+            segment_idx += 1
+        # Кадри, захоплені вже після зупинки циклу, потрапили лише в архів
+        discard_unanalysed(segment_idx, clock.segment_idx + 1)
+
+        inference_queue.close()
+        for worker in workers:
+            worker.join()
+
+        if archive:
+            archive.close()
+        flush_artifacts(settings)
+
+        if log_callback:
+            log_callback(format_pipeline_stats(queues, workers))
+            if scheduler:
+                log_callback(scheduler.summary())
+            if motion_gate:
+                log_callback(motion_gate.summary())
+            if stats["reconnects"]:
+                log_callback(f"🔌 Перепідключень: {stats['reconnects']}, загальний розрив {stats['gap_sec']:.1f} с")
+            if archive:
+                log_callback(archive.stats.summary())
+            log_callback(f"✅ RTSP запис завершено: {archive.path if archive else segment_dir}")
 
-    return all_results
+        if store is not None:
+            store.flush()
+        return sorted(all_results, key=lambda item: item[0])
+    finally:
+        cap.release()
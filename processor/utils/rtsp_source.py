@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+import cv2
+from .decoder import open_video, resolve_decoder
+from .settings import get_section
+
+DEFAULT_RTSP_SETTINGS = {
+    "transport": "tcp",
+    "open_timeout_sec": 10,
+    "read_timeout_sec": 5,
+    "buffer_size": 1048576,
+    "max_delay_ms": 500,
+    "low_delay": True,
+    "extra_options": "",
+    "reconnect": True,
+    "backoff_sec": 1,
+    "max_backoff_sec": 30,
+    "max_reconnects": 0,
+}
+
+# OPENCV_FFMPEG_CAPTURE_OPTIONS — змінна процесу, тож відкриття потоків серіалізуються
+_open_lock = threading.Lock()
+
+
+def get_rtsp_settings(settings):
+    return get_section(settings, "rtsp", DEFAULT_RTSP_SETTINGS)
+
+
+def ffmpeg_options(rtsp):
+    options = {"rtsp_transport": rtsp["transport"]}
+    if rtsp["buffer_size"]:
+        options["buffer_size"] = str(int(rtsp["buffer_size"]))
+    if rtsp["max_delay_ms"]:
+        options["max_delay"] = str(int(rtsp["max_delay_ms"] * 1000))
+    if rtsp["low_delay"]:
+        # Без внутрішньої буферизації декодер віддає кадр одразу, затримка не накопичується
+        options.update({"fflags": "nobuffer", "flags": "low_delay"})
+    for option in filter(None, rtsp["extra_options"].split("|")):
+        key, _, value = option.partition(";")
+        options[key] = value
+    return options
+
+
+def ffmpeg_capture_options(rtsp):
+    return "|".join(f"{key};{value}" for key, value in ffmpeg_options(rtsp).items())
+
+
+# PyAV отримує опції FFmpeg напряму, без змінної середовища
+def open_capture(url, rtsp, decoder):
+    if decoder["backend"] == "pyav":
+        return open_video(
+            url, decoder, options=ffmpeg_options(rtsp), timeout=(rtsp["open_timeout_sec"], rtsp["read_timeout_sec"])
+        )
+    params = [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(rtsp["open_timeout_sec"] * 1000),
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(rtsp["read_timeout_sec"] * 1000),
+    ]
+    # Опції потрібні лише на час відкриття; після нього змінна повертається як була,
+    # інакше звичайні файли, відкриті пізніше, успадкували б RTSP-опції
+    with _open_lock:
+        previous = os.environ.get("OPENCV_FFMPEG_CAPTURE_OPTIONS")
+        os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = ffmpeg_capture_options(rtsp)
+        try:
+            return open_video(url, decoder, params=params)
+        finally:
+            if previous is None:
+                del os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"]
+            else:
+                os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = previous
+
+
+# Обгортка над VideoCapture, що при обриві перепідключається з експоненційною затримкою.
+# Для споживача потік виглядає безперервним: read() повертає False лише коли спроби
+# вичерпано або запис зупинено, а кожен розрив повідомляється через on_gap(початок, кінець).
+# full_frames — кадри потрібні архіву, тож декодер не може їх пропускати.
+class ReconnectingCapture:
+    def __init__(
+        self, url, settings=None, log_callback=None, stop_callback=lambda: False, on_gap=None, full_frames=False
+    ):
+        self.url = url
+        self.rtsp = get_rtsp_settings(settings)
+        self.decoder = resolve_decoder(settings, full_frames, log_callback)
+        self.log_callback = log_callback
+        self.stop_callback = stop_callback
+        self.on_gap = on_gap
+        self.reconnects = 0
+        self.frame_size = None
+        # Локальний файл (чи інше джерело без схеми) закінчується, а не обривається
+        self.reconnect = self.rtsp["reconnect"] and "://" in url
+        self._interrupted = threading.Event()
+        self._resize_logged = False
+        self._cap = open_capture(url, self.rtsp, self.decoder)
+        if self._cap.isOpened():
+            self.frame_size = (int(self._cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self._cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def release(self):
+        self._cap.release()
+
+    def interrupt(self):
+        self._interrupted.set()
+
+    def _stopped(self):
+        return self._interrupted.is_set() or self.stop_callback()
+
+    def read(self):
+        ret, frame = self._cap.read()
+        if not ret:
+            if not self.reconnect or self._stopped():
+                return ret, frame
+            ret, frame = self._reconnect()
+            if not ret:
+                return ret, frame
+        return True, self._fit(frame)
+
+    def _reconnect(self):
+        gap_started = time.time()
+        backoff = self.rtsp["backoff_sec"]
+        attempts = 0
+        while not self._stopped():
+            max_reconnects = self.rtsp["max_reconnects"]
+            if max_reconnects and attempts >= max_reconnects:
+                if self.log_callback:
+                    self.log_callback(f"❌ RTSP: вичерпано {max_reconnects} спроб перепідключення")
+                return False, None
+            attempts += 1
+            if self.log_callback:
+                self.log_callback(f"🔌 RTSP обірвався, перепідключення через {backoff} с (спроба {attempts})")
+            if self._interrupted.wait(backoff):
+                break
+            self._cap.release()
+            self._cap = open_capture(self.url, self.rtsp, self.decoder)
+            ret, frame = self._cap.read() if self._cap.isOpened() else (False, None)
+            if ret:
+                self.reconnects += 1
+                gap_ended = time.time()
+                if self.log_callback:
+                    self.log_callback(f"✅ RTSP відновлено, розрив {gap_ended - gap_started:.1f} с")
+                if self.on_gap:
+                    self.on_gap(gap_started, gap_ended)
+                return True, frame
+            backoff = min(backoff * 2, self.rtsp["max_backoff_sec"])
+        return False, None
+
+    # Після перепідключення камера може віддати інше розширення, а буфер сегмента
+    # вже розрахований на початкову ширину кадру
+    def _fit(self, frame):
+        if (frame.shape[1], frame.shape[0]) == self.frame_size:
+            return frame
+        if self.frame_size is None or not all(self.frame_size):
+            self.frame_size = (frame.shape[1], frame.shape[0])
+            return frame
+        if self.log_callback and not self._resize_logged:
+            self._resize_logged = True
+            self.log_callback(f"⚠️ RTSP: розмір кадру змінився на {frame.shape[1]}x{frame.shape[0]}, масштабуємо")
+        return cv2.resize(frame, self.frame_size, interpolation=cv2.INTER_AREA)
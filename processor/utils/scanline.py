@@ -0,0 +1,218 @@
+import time
+import numpy as np
+from .metrics import observe
+from .settings import get_section
+from .stitcher import build_stitched_image, get_stitcher_settings, resolve_target_width
+
+# Кожна лінія: {"name": ..., "y": 0.25} або {"name": ..., "points": [[x, y], ...]} —
+# координати в частках ширини/висоти кадру; "x_range": [від, до] обмежує лінію смугою руху
+DEFAULT_SCAN_LINES_SETTINGS = {
+    "lines": [],
+}
+
+DEFAULT_LINE_Y = 0.25
+
+
+def get_scan_lines_settings(settings):
+    return get_section(settings, "scan_lines", DEFAULT_SCAN_LINES_SETTINGS)
+
+
+def _polyline_pixels(points):
+    xs, ys = [], []
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        steps = int(max(abs(x1 - x0), abs(y1 - y0))) + 1
+        xs.append(np.rint(np.linspace(x0, x1, steps)).astype(np.intp))
+        ys.append(np.rint(np.linspace(y0, y1, steps)).astype(np.intp))
+    xs, ys = np.concatenate(xs), np.concatenate(ys)
+    # Сусідні відрізки мають спільну точку — прибираємо повтори
+    keep = np.ones(len(xs), dtype=bool)
+    keep[1:] = (np.diff(xs) != 0) | (np.diff(ys) != 0)
+    return ys[keep], xs[keep]
+
+
+class ScanLine:
+    def __init__(self, name, ys, xs):
+        self.name = name
+        self.ys = ys
+        self.xs = xs
+
+    def __len__(self):
+        return len(self.xs)
+
+
+# Набір ліній сканування одного джерела. Пікселі всіх ліній зчитуються з кадру одним
+# векторним gather-ом, тож вартість декодування не залежить від кількості ліній.
+class ScanLines:
+    def __init__(self, lines, band=1):
+        self.lines = lines
+        self.band = max(1, int(band))
+        self.top = min(int(line.ys.min()) for line in lines)
+        self.bottom = max(int(line.ys.max()) for line in lines)
+        self._ys = np.concatenate([line.ys for line in lines])
+        self._xs = np.concatenate([line.xs for line in lines])
+        self._splits = np.cumsum([len(line) for line in lines])[:-1]
+        self._offsets = np.arange(self.band) - self.band // 2
+        # Одна горизонтальна лінія (типовий випадок) читається зрізом, без індексування
+        self._slice = None
+        if len(lines) == 1 and np.all(lines[0].ys == lines[0].ys[0]) and np.all(np.diff(lines[0].xs) == 1):
+            self._slice = (int(lines[0].ys[0]), int(lines[0].xs[0]), int(lines[0].xs[-1]) + 1)
+
+    @classmethod
+    def from_settings(cls, settings, frame_width, frame_height):
+        band = get_stitcher_settings(settings)["band"]
+        config = get_scan_lines_settings(settings)["lines"]
+        if not config:
+            return cls([ScanLine(None, np.full(frame_width, frame_height // 4), np.arange(frame_width))], band)
+        lines = []
+        for i, line in enumerate(config):
+            x_from, x_to = line.get("x_range") or (0.0, 1.0)
+            x_from, x_to = int(x_from * (frame_width - 1)), int(x_to * (frame_width - 1))
+            if line.get("points"):
+                points = [(x * (frame_width - 1), y * (frame_height - 1)) for x, y in line["points"]]
+                ys, xs = _polyline_pixels(points)
+                inside = (xs >= x_from) & (xs <= x_to)
+                ys, xs = ys[inside], xs[inside]
+            else:
+                xs = np.arange(x_from, x_to + 1)
+                ys = np.full(len(xs), int(line.get("y", DEFAULT_LINE_Y) * frame_height))
+            ys, xs = np.clip(ys, 0, frame_height - 1), np.clip(xs, 0, frame_width - 1)
+            if not len(xs):
+                raise ValueError(f"Лінія сканування {line.get('name') or i + 1} не перетинає кадр")
+            lines.append(ScanLine(line.get("name") or f"line{i + 1}", ys, xs))
+        return cls(lines, band)
+
+    @property
+    def named(self):
+        return self.lines[0].name is not None
+
+    # Лінії для кадрів, обрізаних зверху на dy рядків (ROI-смуга)
+    def shifted(self, dy):
+        if not dy:
+            return self
+        return ScanLines([ScanLine(line.name, line.ys - dy, line.xs) for line in self.lines], self.band)
+
+    def sample(self, frame):
+        if self._slice is not None:
+            y, x_from, x_to = self._slice
+            if self.band == 1:
+                return [frame[y, x_from:x_to]]
+            top = min(max(0, y - self.band // 2), frame.shape[0] - self.band)
+            return [frame[top:top + self.band, x_from:x_to].mean(axis=0).round().astype(np.uint8)]
+        if self.band == 1:
+            values = frame[self._ys, self._xs]
+        else:
+            # Смуга навколо кожного пікселя лінії усереднюється по вертикалі
+            ys = np.clip(self._ys[None, :] + self._offsets[:, None], 0, frame.shape[0] - 1)
+            values = frame[ys, self._xs].mean(axis=0).round().astype(np.uint8)
+        return np.split(values, self._splits)
+
+
+# Замість буфера повних кадрів зберігається лише рядок лінії сканування за кожен кадр,
+# тож пам'ять сегмента залежить від довжини лінії, а не від розміру кадру.
+class ScanLineAccumulator:
+    def __init__(self, segment_frames, line_length, target_width, interpolation="area", row_rate=None):
+        self.segment_frames = segment_frames
+        self.line_length = line_length
+        self.target_width = max(1, target_width)
+        self.interpolation = interpolation
+        self.rows = np.zeros((segment_frames, line_length, 3), dtype=np.uint8)
+        self.count = 0
+        # frames — скільки кадрів джерела покрито (з пропущеними планувальником),
+        # timestamps — час захоплення кожного взятого рядка
+        self.frames = 0
+        self.row_rate = row_rate
+        self.timestamps = np.zeros(segment_frames, dtype=np.float64)
+
+    def __len__(self):
+        return self.count
+
+    def is_full(self):
+        return self.frames >= self.segment_frames
+
+    def started_at(self):
+        return float(self.timestamps[0]) if self.count else None
+
+    def add_row(self, row, timestamp=None, frames=1):
+        if timestamp is not None:
+            self.timestamps[self.count] = timestamp
+        self.rows[self.count] = row
+        self.count += 1
+        self.frames += frames
+        return self.is_full()
+
+    def image(self):
+        if self.count == 0:
+            return None
+        return build_stitched_image(self._uniform_rows(), self.target_width, self.interpolation)
+
+    # Якщо кадри пропускались чи губились, рядки розставляються на рівномірну сітку
+    # часу з кроком 1 / row_rate (кожна позиція бере останній рядок до неї), тож висота
+    # зображення відповідає тривалості сегмента, а не кількості взятих кадрів
+    def _uniform_rows(self):
+        rows = self.rows[:self.count]
+        if not self.row_rate or self.count < 2:
+            return rows
+        times = self.timestamps[:self.count]
+        if np.max(np.diff(times)) <= 1.5 / self.row_rate:
+            return rows
+        height = min(self.segment_frames, int(round((times[-1] - times[0]) * self.row_rate)) + 1)
+        grid = np.linspace(times[0], times[-1], height)
+        indexes = np.clip(np.searchsorted(times, grid, side="right") - 1, 0, self.count - 1)
+        return rows[indexes]
+
+    def reset(self):
+        self.count = 0
+        self.frames = 0
+
+
+# Сегмент для всіх ліній сканування джерела: кадр розбирається на рядки ліній один раз,
+# а кожна лінія накопичує власне стічоване зображення
+class MultiLineAccumulator:
+    def __init__(self, scan_lines, accumulators):
+        self.scan_lines = scan_lines
+        self.accumulators = accumulators
+
+    def __len__(self):
+        return len(self.accumulators[0])
+
+    @property
+    def frames(self):
+        return self.accumulators[0].frames
+
+    def is_full(self):
+        return self.accumulators[0].is_full()
+
+    def started_at(self):
+        return self.accumulators[0].started_at()
+
+    def add(self, frame, timestamp=None, frames=1):
+        started = time.perf_counter()
+        for accumulator, row in zip(self.accumulators, self.scan_lines.sample(frame)):
+            accumulator.add_row(row, timestamp, frames)
+        observe("scanline", time.perf_counter() - started)
+        return self.is_full()
+
+    # [(назва лінії, зображення)]; для типової лінії назва None
+    def image(self):
+        if not len(self):
+            return None
+        return [(line.name, accumulator.image()) for line, accumulator in zip(self.scan_lines.lines, self.accumulators)]
+
+    def reset(self):
+        for accumulator in self.accumulators:
+            accumulator.reset()
+
+
+def create_accumulator(segment_frames, scan_lines, source, settings=None, row_rate=None):
+    stitcher = get_stitcher_settings(settings)
+    accumulators = [
+        ScanLineAccumulator(
+            segment_frames,
+            len(line),
+            resolve_target_width(len(line), source, settings),
+            interpolation=stitcher["interpolation"],
+            row_rate=row_rate,
+        )
+        for line in scan_lines.lines
+    ]
+    return MultiLineAccumulator(scan_lines, accumulators)
@@ -0,0 +1,281 @@
+import ctypes
+import ctypes.util
+import os
+import sys
+import cv2
+import numpy as np
+from .settings import get_section
+
+DEFAULT_SCREEN_CAPTURE_SETTINGS = {
+    "backend": "auto",
+    "region": None,
+    "fps": 20,
+}
+
+
+def get_screen_capture_settings(settings):
+    return get_section(settings, "screen_capture", DEFAULT_SCREEN_CAPTURE_SETTINGS)
+
+
+def _clip_region(region, screen_width, screen_height):
+    if not region:
+        return 0, 0, screen_width, screen_height
+    left, top, width, height = (int(v) for v in region)
+    left = min(max(0, left), screen_width - 1)
+    top = min(max(0, top), screen_height - 1)
+    width = min(max(1, width), screen_width - left)
+    height = min(max(1, height), screen_height - top)
+    return left, top, width, height
+
+
+class _XImage(ctypes.Structure):
+    _fields_ = [
+        ("width", ctypes.c_int),
+        ("height", ctypes.c_int),
+        ("xoffset", ctypes.c_int),
+        ("format", ctypes.c_int),
+        ("data", ctypes.c_void_p),
+        ("byte_order", ctypes.c_int),
+        ("bitmap_unit", ctypes.c_int),
+        ("bitmap_bit_order", ctypes.c_int),
+        ("bitmap_pad", ctypes.c_int),
+        ("depth", ctypes.c_int),
+        ("bytes_per_line", ctypes.c_int),
+        ("bits_per_pixel", ctypes.c_int),
+        ("red_mask", ctypes.c_ulong),
+        ("green_mask", ctypes.c_ulong),
+        ("blue_mask", ctypes.c_ulong),
+        ("obdata", ctypes.c_void_p),
+        # create_image, destroy_image, get_pixel, put_pixel, sub_image, add_pixel
+        ("f", ctypes.c_void_p * 6),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ("shmseg", ctypes.c_ulong),
+        ("shmid", ctypes.c_int),
+        ("shmaddr", ctypes.c_void_p),
+        ("readOnly", ctypes.c_int),
+    ]
+
+
+_ZPIXMAP = 2
+_ALL_PLANES = 0xFFFFFFFF
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+# shmat повертає (void *) -1 у разі помилки
+_SHMAT_FAILED = ctypes.c_void_p(-1).value
+
+
+# Захоплення через розширення MIT-SHM: X-сервер пише пікселі прямо у спільну пам'ять,
+# яка відображена у NumPy-масив, тож кадр копіюється лише один раз (BGRA -> BGR).
+class XShmGrabber:
+    name = "xshm"
+
+    def __init__(self, region=None):
+        x11_path = ctypes.util.find_library("X11")
+        xext_path = ctypes.util.find_library("Xext")
+        if not x11_path or not xext_path or not os.environ.get("DISPLAY"):
+            raise RuntimeError("X11/MIT-SHM недоступні")
+        x11 = ctypes.CDLL(x11_path)
+        xext = ctypes.CDLL(xext_path)
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        for fn in ("XDefaultScreen", "XDisplayWidth", "XDisplayHeight", "XDefaultDepth"):
+            getattr(x11, fn).restype = ctypes.c_int
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XRootWindow.restype = ctypes.c_ulong
+        x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xext.XShmQueryExtension.restype = ctypes.c_int
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int, ctypes.c_char_p,
+            ctypes.POINTER(_XShmSegmentInfo), ctypes.c_uint, ctypes.c_uint,
+        ]
+        xext.XShmAttach.restype = ctypes.c_int
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.restype = ctypes.c_int
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage), ctypes.c_int, ctypes.c_int, ctypes.c_ulong,
+        ]
+        libc.shmget.restype = ctypes.c_int
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+        self._x11, self._xext, self._libc = x11, xext, libc
+        self._image = None
+        self._attached = False
+        self._shm = _XShmSegmentInfo()
+        self._shm.shmid = -1
+        self._display = x11.XOpenDisplay(None)
+        if not self._display:
+            raise RuntimeError("Не вдалося підключитися до X-сервера")
+        # Частково створені ресурси (зображення, сегмент, прикріплення) звільняє close()
+        try:
+            self._setup(region)
+        except Exception:
+            self.close()
+            raise
+
+    def _setup(self, region):
+        x11, xext, libc = self._x11, self._xext, self._libc
+        if not xext.XShmQueryExtension(self._display):
+            raise RuntimeError("X-сервер не підтримує MIT-SHM")
+
+        screen = x11.XDefaultScreen(self._display)
+        self._root = x11.XRootWindow(self._display, screen)
+        self.left, self.top, width, height = _clip_region(
+            region, x11.XDisplayWidth(self._display, screen), x11.XDisplayHeight(self._display, screen)
+        )
+        self.size = (width, height)
+
+        self._image = xext.XShmCreateImage(
+            self._display, x11.XDefaultVisual(self._display, screen), x11.XDefaultDepth(self._display, screen),
+            _ZPIXMAP, None, ctypes.byref(self._shm), width, height,
+        )
+        if not self._image:
+            self._image = None
+            raise RuntimeError("XShmCreateImage не вдалося")
+        image = self._image.contents
+        if image.bits_per_pixel != 32:
+            raise RuntimeError(f"Непідтримувана глибина кольору: {image.bits_per_pixel} біт")
+
+        buffer_size = image.bytes_per_line * height
+        self._shm.shmid = libc.shmget(_IPC_PRIVATE, buffer_size, _IPC_CREAT | 0o600)
+        if self._shm.shmid < 0:
+            raise RuntimeError("shmget не вдалося")
+        shmaddr = libc.shmat(self._shm.shmid, None, 0)
+        if shmaddr is None or shmaddr == _SHMAT_FAILED:
+            raise RuntimeError("shmat не вдалося")
+        self._shm.shmaddr = shmaddr
+        self._shm.readOnly = 0
+        image.data = self._shm.shmaddr
+        if not xext.XShmAttach(self._display, ctypes.byref(self._shm)):
+            raise RuntimeError("XShmAttach не вдалося")
+        self._attached = True
+        x11.XSync(self._display, 0)
+        # Сегмент видаляється автоматично, щойно обидві сторони від'єднаються
+        libc.shmctl(self._shm.shmid, _IPC_RMID, None)
+        self._shm.shmid = -1
+
+        raw = np.ctypeslib.as_array((ctypes.c_uint8 * buffer_size).from_address(self._shm.shmaddr))
+        self._raw = raw.reshape(height, image.bytes_per_line // 4, 4)[:, :width]
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+
+    def grab(self):
+        self._xext.XShmGetImage(self._display, self._root, self._image, self.left, self.top, _ALL_PLANES)
+        cv2.cvtColor(self._raw, cv2.COLOR_BGRA2BGR, dst=self._frame)
+        return self._frame
+
+    def close(self):
+        if not self._display:
+            return
+        if self._attached:
+            self._xext.XShmDetach(self._display, ctypes.byref(self._shm))
+            self._x11.XSync(self._display, 0)
+            self._attached = False
+        if self._image is not None:
+            destroy = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.POINTER(_XImage))(self._image.contents.f[1])
+            destroy(self._image)
+            self._image = None
+        if self._shm.shmaddr:
+            self._libc.shmdt(self._shm.shmaddr)
+            self._shm.shmaddr = None
+        if self._shm.shmid >= 0:
+            self._libc.shmctl(self._shm.shmid, _IPC_RMID, None)
+            self._shm.shmid = -1
+        self._x11.XCloseDisplay(self._display)
+        self._display = None
+
+
+class MssGrabber:
+    name = "mss"
+
+    def __init__(self, region=None):
+        import mss
+
+        self._sct = mss.mss()
+        monitor = self._sct.monitors[1]
+        left, top, width, height = _clip_region(region, monitor["width"], monitor["height"])
+        self._monitor = {"left": monitor["left"] + left, "top": monitor["top"] + top, "width": width, "height": height}
+        self.size = (width, height)
+        self._frame = np.empty((height, width, 3), dtype=np.uint8)
+
+    def grab(self):
+        shot = self._sct.grab(self._monitor)
+        raw = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR, dst=self._frame)
+        return self._frame
+
+    def close(self):
+        self._sct.close()
+
+
+class PyAutoGuiGrabber:
+    name = "pyautogui"
+
+    def __init__(self, region=None):
+        import pyautogui
+
+        self._pyautogui = pyautogui
+        screen_size = pyautogui.size()
+        self._region = _clip_region(region, screen_size.width, screen_size.height)
+        self.size = self._region[2:]
+        self._frame = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+
+    def grab(self):
+        img = self._pyautogui.screenshot(region=self._region)
+        cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR, dst=self._frame)
+        return self._frame
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    "xshm": XShmGrabber,
+    "mss": MssGrabber,
+    "pyautogui": PyAutoGuiGrabber,
+}
+
+
+# Повертає захоплювач екрану; grab() щоразу заповнює той самий буфер,
+# тому кадр треба обробити (або скопіювати) до наступного виклику.
+def create_screen_grabber(settings=None, log_callback=None, region=None):
+    capture = get_screen_capture_settings(settings)
+    region = region or capture["region"]
+    backend = capture["backend"]
+    if backend == "auto":
+        candidates = ["xshm", "mss", "pyautogui"] if sys.platform.startswith("linux") else ["mss", "pyautogui"]
+    else:
+        candidates = [backend]
+
+    errors = []
+    for name in candidates:
+        try:
+            grabber = BACKENDS[name](region)
+        except KeyError:
+            raise ValueError(f"Невідомий бекенд захоплення екрану: {name}")
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            continue
+        if log_callback:
+            log_callback(f"🖥️ Захоплення екрану: {name}, {grabber.size[0]}x{grabber.size[1]}")
+        return grabber
+    raise RuntimeError("Жоден бекенд захоплення екрану недоступний (" + "; ".join(errors) + ")")
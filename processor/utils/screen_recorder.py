@@ -1,23 +1,20 @@
-import cv2
-import numpy as np
-import pyautogui
 import time
 import os
+from collections import deque
 from datetime import datetime
-from .yolo_utils import detect_and_save
-
-
-def build_stitched_image(frames, line_y):
-    if not frames:
-        return None
-    original_width = frames[0].shape[1]
-    target_width = original_width // 8
-    stitched_lines = []
-    for frame in frames:
-        line = frame[line_y:line_y + 1, :, :]
-        resized_line = cv2.resize(line, (target_width, 1), interpolation=cv2.INTER_AREA)
-        stitched_lines.append(resized_line)
-    return np.vstack(stitched_lines)
+from .yolo_utils import detect_lines
+from .artifact_writer import flush_artifacts
+from .metrics import observe
+from .results_store import get_results_store, get_results_store_settings
+from .scanline import ScanLines, create_accumulator
+from .motion_gate import MotionGate
+from .frame_scheduler import FrameScheduler
+from .pipeline import BoundedQueue, get_pipeline_settings, start_workers
+from .inference_service import get_inference_settings
+from .screen_grabber import create_screen_grabber, get_screen_capture_settings
+from .roi import RoiCropper
+from .archive import ARCHIVE_OFF, get_archive_config
+from .segment_writer import SegmentEnd, StreamArchive
 
 
 def record_and_process_screen(
@@ -26,24 +23,76 @@ def record_and_process_screen(
     segment_length_sec,
     model_path,
     video_name="screen_capture",
+    device=None,
+    settings=None,
+    preview_callback=None,
+    result_callback=None,
     log_callback=None,
     stop_callback=lambda: False
 ):
-    screen_size = pyautogui.size()
-    fps = 20
+    capture_settings = get_screen_capture_settings(settings)
+    grabber = create_screen_grabber(settings, log_callback)
+    frame_size = grabber.size
+    scan_lines = ScanLines.from_settings(settings, *frame_size)
+    archive_config = get_archive_config(settings, "screen")
+    archive_enabled = archive_config["mode"] != ARCHIVE_OFF
+    cropper = RoiCropper.from_settings(frame_size[1], scan_lines.top, settings, scan_lines.bottom)
+    if cropper and not archive_enabled:
+        # Повний екран не потрібен: захоплюємо лише смугу навколо лінії сканування
+        left, top = (capture_settings["region"] or (0, 0))[:2]
+        grabber.close()
+        grabber = create_screen_grabber(
+            settings, log_callback, region=(left, top + cropper.top, frame_size[0], cropper.height)
+        )
+    fps = capture_settings["fps"]
     segment_frames = int(segment_length_sec * fps)
     video_name_base = f"{video_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     segment_dir = os.path.join(output_folder, video_name_base)
-    full_video_path = os.path.join(segment_dir, f"{video_name_base}.avi")
     os.makedirs(segment_dir, exist_ok=True)
 
-    fourcc = cv2.VideoWriter_fourcc(*"XVID")
-    video_writer = cv2.VideoWriter(full_video_path, fourcc, fps, screen_size)
+    archive = None
+    if archive_enabled:
+        archive = StreamArchive(
+            archive_config, os.path.join(segment_dir, video_name_base), fps, frame_size, settings, log_callback,
+        )
 
-    buffer = []
     segment_idx = 1
-    line_y = screen_size.height // 4
-    all_results = []
+    accumulator = create_accumulator(
+        segment_frames, scan_lines.shifted(cropper.top if cropper else 0), "screen", settings, row_rate=fps
+    )
+    scheduler = FrameScheduler.from_settings(settings, log_callback)
+    store = get_results_store(settings, output_folder)
+    motion_gate = MotionGate.from_settings(settings)
+    if store is not None and duration == 0:
+        # Безперервний запис: повна історія вже в базі, у пам'яті лише останні сегменти
+        all_results = deque(maxlen=get_results_store_settings(settings)["max_in_memory"])
+    else:
+        all_results = []
+
+    def run_inference(job):
+        job_idx, line_images, started_at, frame_count = job
+        segment_info = {
+            "source": video_name,
+            "run_id": video_name_base,
+            "started_at": started_at,
+            "start_sec": started_at - start_time,
+            "duration_sec": frame_count / fps,
+        }
+        class_counts = detect_lines(
+            model_path, line_images, segment_dir, video_name_base + ".avi", job_idx, device=device, settings=settings,
+            store=store, segment_info=segment_info, motion_gate=motion_gate
+        )
+        all_results.append((job_idx, class_counts))
+        if result_callback:
+            result_callback(dict(segment_info, segment_idx=job_idx, counts=class_counts))
+        if archive:
+            archive.segment_done(job_idx, class_counts)
+
+    # Детекція у фонових воркерах, щоб цикл захоплення тримав цільовий fps
+    inference_queue = BoundedQueue.from_settings("inference", get_pipeline_settings(settings))
+    inference_workers = start_workers(
+        "inference", inference_queue, run_inference, get_inference_settings(settings)["batch_size"], log_callback
+    )
 
     if log_callback:
         msg = f"⏺ Безперервний запис екрану..." if duration == 0 else f"⏺ Запис екрану розпочато на {duration} сек..."
@@ -51,7 +100,10 @@ def record_and_process_screen(
 
     frame_time = 1.0 / fps
     start_time = time.time()
+    # Розклад тактів: frame_idx — номер такту, grabbed — скільки кадрів справді захоплено
+    schedule_start = start_time
     frame_idx = 0
+    grabbed = 0
 
     while True:
         if stop_callback():
@@ -62,36 +114,77 @@ def record_and_process_screen(
         if duration > 0 and (time.time() - start_time >= duration):
             break
 
-        img = pyautogui.screenshot()
-        frame = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-
-        video_writer.write(frame)
-        buffer.append(frame)
         frame_idx += 1
-
-        if len(buffer) == segment_frames:
-            if log_callback:
-                log_callback(f"🧪 Обробка сегмента {segment_idx}")
-            stitched_img = build_stitched_image(buffer, line_y)
-            class_counts = detect_and_save(model_path, stitched_img, segment_dir, video_name_base + ".avi", segment_idx)
-            all_results.append((segment_idx, class_counts))
-            buffer.clear()
-            segment_idx += 1
-
-        elapsed = time.time() - (start_time + frame_idx * frame_time)
-        if elapsed < 0:
-            time.sleep(-elapsed)
-
-    if buffer:
+        covered = scheduler.sample() if scheduler else 1
+        # Пропущений такт без архіву не захоплює екран зовсім — це й знімає навантаження
+        if covered or archive:
+            # Буфер кадру перевикористовується: writer і акумулятор копіюють дані одразу
+            grab_started = time.perf_counter()
+            frame = grabber.grab()
+            captured_at = time.time()
+            observe("grab", time.perf_counter() - grab_started)
+            grabbed += 1
+
+            if archive:
+                archive.write(frame.copy() if archive.buffered else frame)
+                if cropper:
+                    frame = cropper.crop(frame)
+        if covered:
+            if cropper and preview_callback:
+                preview = cropper.preview(frame)
+                if preview is not None:
+                    preview_callback(preview)
+
+            if accumulator.add(frame, captured_at, covered):
+                if log_callback:
+                    achieved_fps = grabbed / max(time.time() - start_time, 1e-6)
+                    log_callback(f"🎯 {achieved_fps:.1f} fps з цільових {fps}")
+                    log_callback(f"🧪 Обробка сегмента {segment_idx}")
+                inference_queue.put((segment_idx, accumulator.image(), accumulator.started_at(), accumulator.frames))
+                if archive:
+                    archive.write(SegmentEnd(segment_idx))
+                accumulator.reset()
+                segment_idx += 1
+
+        # Відставання — наскільки цикл запізнюється відносно розкладу тактів
+        lag = time.time() - (schedule_start + frame_idx * frame_time)
+        if scheduler:
+            scheduler.update(lag)
+            if lag > scheduler.max_lag and scheduler.step == scheduler.max_step:
+                # Навіть з максимальним кроком не встигаємо: відкидаємо пропущені такти
+                if log_callback:
+                    log_callback(f"⏩ Запис екрану відстав на {lag:.1f} с, пропускаємо до поточного часу")
+                schedule_start += lag
+                lag = 0.0
+        if lag < 0:
+            time.sleep(-lag)
+
+    capture_time = time.time() - start_time
+    grabber.close()
+
+    if len(accumulator):
         if log_callback:
             log_callback(f"🧪 Обробка останнього сегмента {segment_idx}")
-        stitched_img = build_stitched_image(buffer, line_y)
-        class_counts = detect_and_save(model_path, stitched_img, segment_dir, video_name_base + ".avi", segment_idx)
-        all_results.append((segment_idx, class_counts))
+        inference_queue.put((segment_idx, accumulator.image(), accumulator.started_at(), accumulator.frames))
 
-    video_writer.release()
+    inference_queue.close()
+    for worker in inference_workers:
+        worker.join()
+    if archive:
+        archive.close()
+    flush_artifacts(settings)
 
     if log_callback:
-        log_callback(f"✅ Запис завершено: {full_video_path}")
-
-    return all_results
+        achieved_fps = grabbed / capture_time if capture_time > 0 else 0.0
+        log_callback(f"🎯 Досягнуто {achieved_fps:.1f} fps з цільових {fps}")
+        if scheduler:
+            log_callback(scheduler.summary())
+        if motion_gate:
+            log_callback(motion_gate.summary())
+        if archive:
+            log_callback(archive.stats.summary())
+        log_callback(f"✅ Запис завершено: {archive.path if archive else segment_dir}")
+
+    if store is not None:
+        store.flush()
+    return sorted(all_results, key=lambda item: item[0])
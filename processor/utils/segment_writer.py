@@ -0,0 +1,253 @@
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .archive import ARCHIVE_DETECTIONS, ARCHIVE_FULL, ArchiveStats, ArchiveWriter, archive_extension
+from .pipeline import BLOCK, CLOSED, BoundedQueue
+from .settings import get_section
+
+REENCODE = "reencode"
+STREAM_COPY = "copy"
+
+DEFAULT_SEGMENT_WRITER_SETTINGS = {
+    "mode": REENCODE,
+    "workers": 2,
+    "queue_size": 64,
+}
+
+
+def get_segment_writer_settings(settings):
+    return get_section(settings, "segment_writer", DEFAULT_SEGMENT_WRITER_SETTINGS)
+
+
+def stream_copy_available():
+    return shutil.which("ffmpeg") is not None
+
+
+class _SegmentWriter(threading.Thread):
+    def __init__(self, path, codec, fps, frame_size, queue_size, stats, on_done, log_callback=None):
+        super().__init__(name=f"segment-writer:{os.path.basename(path)}", daemon=True)
+        self.path = path
+        self.codec = codec
+        self.fps = fps
+        self.frame_size = frame_size
+        self.frames = BoundedQueue("segment", queue_size, BLOCK)
+        self.stats = stats
+        self.on_done = on_done
+        self.log_callback = log_callback
+
+    def write(self, frame):
+        self.frames.put(frame)
+
+    def finish(self):
+        self.frames.close()
+
+    def run(self):
+        out = None
+        try:
+            out = ArchiveWriter(self.path, self.codec, self.fps, self.frame_size, self.stats)
+            while True:
+                frame = self.frames.get()
+                if frame is CLOSED:
+                    break
+                out.write(frame)
+        except Exception as e:
+            if self.log_callback:
+                self.log_callback(f"⚠️ Помилка запису сегмента {self.path}: {e}")
+            # Вичитуємо чергу, щоб джерело не зависло на блокуючому put
+            while self.frames.get() is not CLOSED:
+                pass
+        finally:
+            if out is not None:
+                out.release()
+            self.on_done(self.path)
+
+
+# Кодування сегментів у фонових потоках: кадри передаються письменнику одразу після
+# декодування, а кількість одночасно відкритих сегментів обмежена розміром пулу.
+class SegmentWriterPool:
+    def __init__(self, fps, frame_size, workers=2, queue_size=64, codec="XVID", stats=None, log_callback=None):
+        self.fps = fps
+        self.frame_size = frame_size
+        self.queue_size = queue_size
+        self.codec = codec
+        self.stats = stats or ArchiveStats()
+        self.log_callback = log_callback
+        self._slots = threading.Semaphore(max(1, workers))
+        self._writers = []
+        self._copy_executor = None
+        self._copy_futures = []
+        self._workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._discard = set()
+
+    @classmethod
+    def from_settings(cls, fps, frame_size, codec, settings, stats=None, log_callback=None):
+        writer_settings = get_segment_writer_settings(settings)
+        return cls(
+            fps,
+            frame_size,
+            workers=writer_settings["workers"],
+            queue_size=writer_settings["queue_size"],
+            codec=codec,
+            stats=stats,
+            log_callback=log_callback,
+        )
+
+    def open(self, path):
+        self._slots.acquire()
+        with self._lock:
+            self._pending.add(path)
+        writer = _SegmentWriter(
+            path, self.codec, self.fps, self.frame_size, self.queue_size, self.stats, self._on_done, self.log_callback
+        )
+        writer.start()
+        self._writers = [w for w in self._writers if w.is_alive()] + [writer]
+        return writer
+
+    def _on_done(self, path):
+        self._slots.release()
+        self._finish(path)
+
+    def _finish(self, path):
+        with self._lock:
+            self._pending.discard(path)
+            remove = path in self._discard
+            self._discard.discard(path)
+        if remove:
+            self._remove(path)
+
+    def _remove(self, path):
+        self.stats.add_discarded(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # Сегмент видаляється одразу або, якщо його ще пишуть (чи енкодер ще не дійшов
+    # до нього), щойно письменник закриє файл
+    def discard(self, path):
+        with self._lock:
+            if path in self._pending or not os.path.exists(path):
+                self._discard.add(path)
+                return
+        self._remove(path)
+
+    def copy(self, source_path, path, start_sec, duration_sec):
+        if self._copy_executor is None:
+            self._copy_executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="segment-copy")
+        with self._lock:
+            self._pending.add(path)
+        self._copy_futures.append(
+            self._copy_executor.submit(self._stream_copy, source_path, path, start_sec, duration_sec)
+        )
+
+    def _stream_copy(self, source_path, path, start_sec, duration_sec):
+        # Без перекодування ffmpeg ріже по ключових кадрах, тому межі можуть зсунутись
+        command = [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-ss", f"{start_sec:.3f}", "-i", source_path,
+            "-t", f"{duration_sec:.3f}", "-c", "copy", "-an", path,
+        ]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0 and self.log_callback:
+            self.log_callback(f"⚠️ ffmpeg не зміг вирізати сегмент {path}: {result.stderr.strip()}")
+        self.stats.add_file(path)
+        self._finish(path)
+
+    def close(self):
+        for writer in self._writers:
+            writer.join()
+        self._writers = []
+        if self._copy_executor is not None:
+            for future in self._copy_futures:
+                future.result()
+            self._copy_executor.shutdown()
+            self._copy_executor = None
+            self._copy_futures = []
+
+
+# Маркер кінця сегмента для синхронного запису (екран): ставиться, коли акумулятор
+# детекції закриває сегмент, тож кліп архіву має ті самі межі й номер, що й сегмент
+class SegmentEnd:
+    def __init__(self, segment_idx):
+        self.segment_idx = segment_idx
+
+
+# Ріже безперервний потік кадрів на файли за номером сегмента кадру (RTSP) або за
+# маркерами SegmentEnd (екран) в режимі архіву лише сегментів з детекціями.
+class SegmentRoller:
+    def __init__(self, pool, path_for_segment, first_segment=1):
+        self.pool = pool
+        self.path_for_segment = path_for_segment
+        self.segment_idx = first_segment
+        self._writer = None
+
+    def write(self, frame, segment_idx=None):
+        if segment_idx is not None and segment_idx != self.segment_idx:
+            self.end_segment(segment_idx - 1)
+        if self._writer is None:
+            self._writer = self.pool.open(self.path_for_segment(self.segment_idx))
+        self._writer.write(frame)
+
+    def end_segment(self, segment_idx):
+        if self._writer is not None:
+            self._writer.finish()
+            self._writer = None
+        self.segment_idx = segment_idx + 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.finish()
+            self._writer = None
+        self.pool.close()
+
+
+# Архів безперервного джерела (RTSP/екран): один файл у режимі full або окремі
+# сегменти, з яких після детекції залишаються лише ті, де щось знайдено.
+class StreamArchive:
+    def __init__(self, config, base_path, fps, frame_size, settings=None, log_callback=None, first_segment=1):
+        self.mode = config["mode"]
+        self.stats = ArchiveStats()
+        self.base_path = base_path
+        self.extension = archive_extension(config)
+        self._writer = None
+        self._roller = None
+        if self.mode == ARCHIVE_FULL:
+            self.path = base_path + self.extension
+            self._writer = ArchiveWriter(self.path, config["codec"], fps, frame_size, self.stats)
+        else:
+            self.path = os.path.dirname(base_path)
+            pool = SegmentWriterPool.from_settings(fps, frame_size, config["codec"], settings, self.stats, log_callback)
+            self._roller = SegmentRoller(pool, self.segment_path, first_segment)
+
+    # Сегменти пишуться у фонових потоках, тож кадр з перевикористовуваного буфера треба копіювати
+    @property
+    def buffered(self):
+        return self._roller is not None
+
+    def segment_path(self, segment_idx):
+        return f"{self.base_path}_segment{segment_idx}{self.extension}"
+
+    # frame — кадр або маркер SegmentEnd; segment_idx — номер сегмента кадру, якщо його
+    # поставив потік захоплення
+    def write(self, frame, segment_idx=None):
+        if isinstance(frame, SegmentEnd):
+            if self._roller is not None:
+                self._roller.end_segment(frame.segment_idx)
+        elif self._writer is not None:
+            self._writer.write(frame)
+        else:
+            self._roller.write(frame, segment_idx)
+
+    def segment_done(self, segment_idx, class_counts):
+        if self.mode == ARCHIVE_DETECTIONS and not class_counts:
+            self._roller.pool.discard(self.segment_path(segment_idx))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+        else:
+            self._roller.close()
@@ -0,0 +1,13 @@
+import copy
+
+
+# Повертає секцію конфігурації, доповнену значеннями за замовчуванням
+def get_section(settings, name, defaults):
+    section = copy.deepcopy(defaults)
+    value = (settings or {}).get(name) or {}
+    for key, item in value.items():
+        if isinstance(item, dict) and isinstance(section.get(key), dict):
+            section[key].update(item)
+        else:
+            section[key] = item
+    return section
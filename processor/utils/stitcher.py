@@ -0,0 +1,42 @@
+import time
+import cv2
+from .metrics import observe
+from .settings import get_section
+
+INTERPOLATIONS = {
+    "nearest": cv2.INTER_NEAREST,
+    "linear": cv2.INTER_LINEAR,
+    "cubic": cv2.INTER_CUBIC,
+    "area": cv2.INTER_AREA,
+    "lanczos": cv2.INTER_LANCZOS4,
+}
+
+DEFAULT_STITCHER_SETTINGS = {
+    "width": 0,
+    "width_divisor": {"file": 2, "rtsp": 16, "screen": 8},
+    "interpolation": "area",
+    "band": 1,
+}
+
+
+def get_stitcher_settings(settings):
+    return get_section(settings, "stitcher", DEFAULT_STITCHER_SETTINGS)
+
+
+def resolve_target_width(frame_width, source, settings=None):
+    stitcher = get_stitcher_settings(settings)
+    if stitcher["width"]:
+        return int(stitcher["width"])
+    divisor = stitcher["width_divisor"].get(source, 1)
+    return max(1, frame_width // max(1, int(divisor)))
+
+
+def build_stitched_image(rows, target_width, interpolation="area"):
+    if rows is None or len(rows) == 0:
+        return None
+    # Усі рядки масштабуються одним викликом: висота не змінюється, тож результат
+    # збігається з порядковим resize кожного рядка окремо
+    started = time.perf_counter()
+    image = cv2.resize(rows, (target_width, rows.shape[0]), interpolation=INTERPOLATIONS[interpolation])
+    observe("stitch", time.perf_counter() - started)
+    return image
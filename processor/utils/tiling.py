@@ -0,0 +1,101 @@
+import numpy as np
+from .inference_backends import STRIDE, Detections
+from .settings import get_section
+
+DEFAULT_TILING_SETTINGS = {
+    "enabled": False,
+    "min_aspect": 2.0,
+    "tile_aspect": 1.0,
+    "overlap": 0.25,
+    "tile_imgsz": 0,
+    "merge_threshold": 0.6,
+}
+
+
+def get_tiling_settings(settings):
+    return get_section(settings, "tiling", DEFAULT_TILING_SETTINGS)
+
+
+# Стічоване зображення ріжеться вздовж осі часу (висоти) на плитки висотою
+# width * tile_aspect з перекриттям; остання плитка притиснута до низу
+def plan_tiles(height, width, tile_aspect=1.0, overlap=0.25, min_aspect=2.0):
+    tile_height = max(1, int(round(width * tile_aspect)))
+    if height < tile_height * max(1.0, min_aspect):
+        return [(0, height)]
+    step = max(1, int(tile_height * (1 - overlap)))
+    starts = list(range(0, height - tile_height, step))
+    starts.append(height - tile_height)
+    return [(top, top + tile_height) for top in starts]
+
+
+# 0 — плитка подається в модель у власному розмірі (з округленням до кроку сітки),
+# тож обчислень не більше, ніж для одного квадратного входу
+def tile_imgsz(tile_height, width, imgsz=0):
+    if imgsz:
+        return int(imgsz)
+    return max(STRIDE, int(np.ceil(max(tile_height, width) / STRIDE)) * STRIDE)
+
+
+def _as_array(values, columns=None):
+    array = np.array(values.tolist(), dtype=np.float32)
+    return array.reshape(-1, columns) if columns else array.reshape(-1)
+
+
+# Жадібне злиття в межах класу лише для рамок з різних плиток, що обидві заходять у
+# смугу перекриття цих плиток; рамки однієї плитки лишаються такими, як їх дала модель.
+# Перетин рахується відносно меншої рамки, бо машина, розрізана межею плитки, в сусідній
+# плитці видна лише частково (IoU був би малий). tile — індекс плитки кожної рамки.
+def merge_boxes(xyxy, conf, cls, tile, tiles, threshold=0.6):
+    order = np.argsort(-conf)
+    xyxy, conf, cls, tile = xyxy[order].copy(), conf[order], cls[order], tile[order]
+    tops = np.array([top for top, _ in tiles], dtype=np.float32)
+    bottoms = np.array([bottom for _, bottom in tiles], dtype=np.float32)
+    areas = np.maximum(0, xyxy[:, 2] - xyxy[:, 0]) * np.maximum(0, xyxy[:, 3] - xyxy[:, 1])
+    suppressed = np.zeros(len(conf), dtype=bool)
+    keep = []
+    for i in range(len(conf)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        rest = np.where(~suppressed & (cls == cls[i]) & (tile != tile[i]))[0]
+        rest = rest[rest > i]
+        if not len(rest):
+            continue
+        # Смуга перекриття пари плиток; за нульового перекриття — їхня спільна межа
+        band_top = np.maximum(tops[tile[i]], tops[tile[rest]])
+        band_bottom = np.minimum(bottoms[tile[i]], bottoms[tile[rest]])
+        in_band = (
+            (band_top <= band_bottom)
+            & (xyxy[i, 1] <= band_bottom) & (xyxy[i, 3] >= band_top)
+            & (xyxy[rest, 1] <= band_bottom) & (xyxy[rest, 3] >= band_top)
+        )
+        rest = rest[in_band]
+        if not len(rest):
+            continue
+        width = np.minimum(xyxy[i, 2], xyxy[rest, 2]) - np.maximum(xyxy[i, 0], xyxy[rest, 0])
+        height = np.minimum(xyxy[i, 3], xyxy[rest, 3]) - np.maximum(xyxy[i, 1], xyxy[rest, 1])
+        intersection = np.maximum(0, width) * np.maximum(0, height)
+        smaller = np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        merged = rest[intersection / smaller > threshold]
+        if len(merged):
+            # Рамка об'єднується з частинами з інших плиток
+            xyxy[i, :2] = np.minimum(xyxy[i, :2], xyxy[merged, :2].min(axis=0))
+            xyxy[i, 2:] = np.maximum(xyxy[i, 2:], xyxy[merged, 2:].max(axis=0))
+            suppressed[merged] = True
+    keep = np.array(keep, dtype=int)
+    return xyxy[keep], conf[keep], cls[keep]
+
+
+def merge_tile_results(image, names, tiles, results, threshold=0.6):
+    boxes, scores, classes, indices = [], [], [], []
+    for index, ((top, _), result) in enumerate(zip(tiles, results)):
+        xyxy = _as_array(result.boxes.xyxy, 4)
+        xyxy[:, [1, 3]] += top
+        boxes.append(xyxy)
+        scores.append(_as_array(result.boxes.conf))
+        classes.append(_as_array(result.boxes.cls))
+        indices.append(np.full(len(xyxy), index, dtype=int))
+    xyxy, conf, cls = merge_boxes(
+        np.concatenate(boxes), np.concatenate(scores), np.concatenate(classes), np.concatenate(indices), tiles, threshold
+    )
+    return Detections(image, names, xyxy, conf, cls)
@@ -1,25 +1,130 @@
 import os
+import time
 import cv2
-import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from .yolo_utils import detect_and_save
+from .yolo_utils import detect_lines
+from .artifact_writer import flush_artifacts
+from .results_store import get_results_store
+from .metrics import observe
+from .scanline import ScanLines, create_accumulator
+from .motion_gate import MotionGate
+from .pipeline import BoundedQueue, get_pipeline_settings, start_workers
+from .inference_service import get_inference_settings
+from .segment_writer import STREAM_COPY, SegmentWriterPool, get_segment_writer_settings, stream_copy_available
+from .settings import get_section
+from .roi import RoiCropper
+from .decoder import FrameCounter, open_video, resolve_decoder
+from .archive import ARCHIVE_DETECTIONS, ARCHIVE_OFF, ArchiveWriter, archive_extension, get_archive_config
 
+DEFAULT_PARALLEL_SEEK_SETTINGS = {
+    "workers": 0,
+}
 
-def build_stitched_image(frames, line_y):
-    if not frames:
-        return None
-    original_width = frames[0].shape[1]
-    target_width = original_width // 2
-    stitched_lines = []
-    for frame in frames:
-        line = frame[line_y:line_y + 1, :, :]
-        resized_line = cv2.resize(line, (target_width, 1), interpolation=cv2.INTER_AREA)
-        stitched_lines.append(resized_line)
-    return np.vstack(stitched_lines)
 
+def get_parallel_seek_settings(settings):
+    return get_section(settings, "parallel_seek", DEFAULT_PARALLEL_SEEK_SETTINGS)
 
-def process_video_file(video_path, output_folder, model_path, segment_length_sec, log_callback=None, stop_callback=lambda: False):
-    cap = cv2.VideoCapture(video_path)
+
+def _read_segment(
+    video_path, start_frame, frame_count, frame_size, scan_lines, decoder, settings, segment_path, writers, fps,
+    stop_callback
+):
+    cap = open_video(video_path, decoder)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    counter = FrameCounter(cap)
+    cropper = RoiCropper.from_settings(frame_size[1], scan_lines.top, settings, scan_lines.bottom)
+    accumulator = create_accumulator(
+        frame_count, scan_lines.shifted(cropper.top if cropper else 0), "file", settings, row_rate=fps
+    )
+    out = ArchiveWriter(segment_path, writers.codec, fps, frame_size, writers.stats) if writers is not None else None
+    # ArchiveWriter пише кадр одразу, тож буфер декодера можна перевикористовувати завжди
+    frame = None
+    try:
+        while not accumulator.is_full() and not stop_callback():
+            started = time.perf_counter()
+            ret, frame = cap.read(frame if decoder["reuse_buffer"] else None)
+            observe("decode", time.perf_counter() - started)
+            if not ret:
+                break
+            counter.advance()
+            if out is not None:
+                out.write(frame)
+            accumulator.add(cropper.crop(frame) if cropper else frame, counter.position / fps, counter.take())
+    finally:
+        cap.release()
+        if out is not None:
+            out.release()
+    return accumulator.image(), accumulator.frames
+
+
+# Сегменти незалежні, тож кожен потік відкриває власний VideoCapture і перемотує
+# на свій діапазон кадрів; стічовані зображення віддаються на детекцію по порядку.
+def _process_segments_parallel(
+    video_path, video_name, segment_dir, segment_ext, total_frames, segment_frames, frame_size, scan_lines, decoder,
+    fps, workers, write_segments, copy_segments, writers, inference_queue, settings, log_callback, stop_callback
+):
+    boundaries = []
+    for start in range(0, total_frames, segment_frames):
+        segment_idx = len(boundaries) + 1
+        segment_path = os.path.join(segment_dir, f"{video_name}_segment{segment_idx}{segment_ext}")
+        boundaries.append((segment_idx, start, min(segment_frames, total_frames - start), segment_path))
+
+    if log_callback:
+        log_callback(f"⚡ Паралельна обробка: {len(boundaries)} сегментів, потоків {workers}")
+
+    segment_writers = writers if write_segments else None
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="segment-reader") as pool:
+        futures = [
+            pool.submit(
+                _read_segment, video_path, start, count, frame_size, scan_lines, decoder, settings, segment_path,
+                segment_writers, fps, stop_callback
+            )
+            for _, start, count, segment_path in boundaries
+        ]
+        for (segment_idx, start, count, segment_path), future in zip(boundaries, futures):
+            if stop_callback():
+                if log_callback:
+                    log_callback("🛑 Обробка відео зупинена.")
+                for pending in futures:
+                    pending.cancel()
+                return None
+            # Збій одного сегмента не скасовує решту: він пропускається з попередженням
+            try:
+                line_images, read_frames = future.result()
+            except Exception as e:
+                if log_callback:
+                    log_callback(f"⚠️ Сегмент {segment_idx} не прочитано: {e}")
+                continue
+            if line_images is None:
+                if log_callback:
+                    log_callback(f"⚠️ Сегмент {segment_idx} не прочитано: кадри {start}-{start + count} не декодовано")
+                continue
+            if copy_segments:
+                writers.copy(video_path, segment_path, start / fps, read_frames / fps)
+            if log_callback:
+                log_callback(f"🧪 Обробка сегмента {segment_idx}")
+            inference_queue.put((segment_idx, segment_path, line_images, start, count))
+    # Наступний номер сегмента й кадр, з якого послідовно дочитується решта файлу
+    return len(boundaries) + 1, total_frames
+
+
+def process_video_file(video_path, output_folder, model_path, segment_length_sec, device=None, settings=None, preview_callback=None, result_callback=None, log_callback=None, stop_callback=lambda: False):
+    writer_settings = get_segment_writer_settings(settings)
+    stream_copy = writer_settings["mode"] == STREAM_COPY
+    if stream_copy and not stream_copy_available():
+        if log_callback:
+            log_callback("⚠️ ffmpeg не знайдено, сегменти будуть перекодовані")
+        stream_copy = False
+    archive_config = get_archive_config(settings, "file")
+    # Без архіву шлях сегмента лише іменує папку з результатами детекції
+    archive = archive_config["mode"] != ARCHIVE_OFF
+    keep_empty_segments = archive_config["mode"] != ARCHIVE_DETECTIONS
+    write_segments = archive and not stream_copy
+    copy_segments = archive and stream_copy
+
+    decoder = resolve_decoder(settings, full_frames=write_segments, log_callback=log_callback)
+    cap = open_video(video_path, decoder)
     if not cap.isOpened():
         if log_callback:
             log_callback(f"❌ Не вдалося відкрити відео: {video_path}")
@@ -31,7 +136,7 @@ def process_video_file(video_path, output_folder, model_path, segment_length_sec
 
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    line_y = height // 4
+    scan_lines = ScanLines.from_settings(settings, width, height)
     segment_frames = int(segment_length_sec * fps)
 
     video_name = os.path.splitext(os.path.basename(video_path))[0]
@@ -39,53 +144,144 @@ def process_video_file(video_path, output_folder, model_path, segment_length_sec
     segment_dir = os.path.join(output_folder, video_name_base)
     os.makedirs(segment_dir, exist_ok=True)
 
-    buffer = []
+    segment_ext = os.path.splitext(video_path)[1] if stream_copy else archive_extension(archive_config)
+    writers = SegmentWriterPool.from_settings(fps, (width, height), archive_config["codec"], settings, log_callback=log_callback)
+
     segment_idx = 1
     all_results = []
-    fourcc = cv2.VideoWriter_fourcc(*"XVID")
+    store = get_results_store(settings, output_folder)
+    motion_gate = MotionGate.from_settings(settings)
+    run_started = time.time()
+    cropper = RoiCropper.from_settings(height, scan_lines.top, settings, scan_lines.bottom)
+    accumulator = create_accumulator(
+        segment_frames, scan_lines.shifted(cropper.top if cropper else 0), "file", settings, row_rate=fps
+    )
+
+    def run_inference(job):
+        job_idx, job_path, line_images, start_frame, frame_count = job
+        segment_info = {
+            "source": video_name,
+            "run_id": video_name_base,
+            "started_at": run_started + start_frame / fps,
+            "start_sec": start_frame / fps,
+            "duration_sec": frame_count / fps,
+        }
+        class_counts = detect_lines(
+            model_path, line_images, segment_dir, job_path, job_idx, device=device, settings=settings,
+            store=store, segment_info=segment_info, motion_gate=motion_gate
+        )
+        all_results.append((job_idx, class_counts))
+        if result_callback:
+            result_callback(dict(segment_info, segment_idx=job_idx, counts=class_counts))
+        if archive and not keep_empty_segments and not class_counts:
+            writers.discard(job_path)
 
-    while True:
+    inference_queue = BoundedQueue.from_settings("inference", get_pipeline_settings(settings))
+    inference_workers = start_workers(
+        "inference", inference_queue, run_inference, get_inference_settings(settings)["batch_size"], log_callback
+    )
+
+    # З пропуском кадрів у декодері сегмент може покрити трохи більше segment_frames,
+    # тож початок рахується за фактично покритими кадрами
+    def finish_segment(start_frame, is_last=False):
+        if writer is not None:
+            writer.finish()
+        elif copy_segments:
+            writers.copy(video_path, segment_path, start_frame / fps, accumulator.frames / fps)
+
+        if log_callback:
+            label = "останнього сегмента" if is_last else "сегмента"
+            log_callback(f"🧪 Обробка {label} {segment_idx}")
+
+        inference_queue.put((segment_idx, segment_path, accumulator.image(), start_frame, accumulator.frames))
+
+    writer = None
+    segment_path = None
+    segment_start = 0
+    counter = FrameCounter(cap)
+    # Фоновий письменник тримає кадри в черзі, тож буфер декодера перевикористовується
+    # лише без перекодування архіву (акумулятор і ROI копіюють свої рядки одразу)
+    reuse_buffer = decoder["reuse_buffer"] and not write_segments
+    frame = None
+
+    parallel_workers = get_parallel_seek_settings(settings)["workers"]
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if parallel_workers > 1 and total_frames > segment_frames:
+        cap.release()
+        resume = _process_segments_parallel(
+            video_path, video_name, segment_dir, segment_ext, total_frames, segment_frames, (width, height), scan_lines,
+            decoder, fps, parallel_workers, write_segments, copy_segments, writers, inference_queue, settings, log_callback,
+            stop_callback
+        )
+        # CAP_PROP_FRAME_COUNT буває заниженим (оцінка з тривалості), тож після
+        # запланованих сегментів файл дочитується послідовним циклом до кінця
+        if resume is not None:
+            segment_idx, segment_start = resume
+            cap = open_video(video_path, decoder)
+            cap.set(cv2.CAP_PROP_POS_FRAMES, segment_start)
+            counter = FrameCounter(cap)
+
+    while cap.isOpened():
         if stop_callback():
             if log_callback:
                 log_callback("🛑 Обробка відео зупинена.")
             break
 
-        ret, frame = cap.read()
+        started = time.perf_counter()
+        ret, frame = cap.read(frame if reuse_buffer else None)
+        observe("decode", time.perf_counter() - started)
         if not ret:
             break
+        counter.advance()
 
-        buffer.append(frame)
+        # Кадри одразу передаються фоновому письменнику, без проміжного буфера
+        if segment_path is None:
+            segment_path = os.path.join(segment_dir, f"{video_name}_segment{segment_idx}{segment_ext}")
+            if write_segments:
+                writer = writers.open(segment_path)
+        if writer is not None:
+            writer.write(frame)
 
-        if len(buffer) == segment_frames:
-            segment_path = os.path.join(segment_dir, f"{video_name}_segment{segment_idx}.avi")
-            out = cv2.VideoWriter(segment_path, fourcc, fps, (width, height))
-            for f in buffer:
-                out.write(f)
-            out.release()
-
-            if log_callback:
-                log_callback(f"🧪 Обробка сегмента {segment_idx}")
-
-            stitched_img = build_stitched_image(buffer, line_y)
-            class_counts = detect_and_save(model_path, stitched_img, segment_dir, segment_path, segment_idx)
-            all_results.append((segment_idx, class_counts))
+        # frame лишається буфером декодера, тож смуга ROI — окрема змінна
+        band = frame
+        if cropper:
+            band = cropper.crop(frame)
+            if preview_callback:
+                preview = cropper.preview(band)
+                if preview is not None:
+                    preview_callback(preview)
 
+        if accumulator.add(band, counter.position / fps, counter.take()):
+            finish_segment(segment_start)
+            writer = None
+            segment_path = None
             segment_idx += 1
-            buffer.clear()
-
-    if buffer:
-        segment_path = os.path.join(segment_dir, f"{video_name}_segment{segment_idx}.avi")
-        out = cv2.VideoWriter(segment_path, fourcc, fps, (width, height))
-        for f in buffer:
-            out.write(f)
-        out.release()
+            segment_start += accumulator.frames
+            accumulator.reset()
 
-        if log_callback:
-            log_callback(f"🧪 Обробка останнього сегмента {segment_idx}")
+    # Після останнього ключового кадру декодер з skip_frames нічого не віддає, тож хвіст
+    # файлу не потрапляє в жоден сегмент — про це варто знати, звіряючи підсумки
+    covered_frames = segment_start + accumulator.frames
+    if decoder["skip_frames"] != "none" and not stop_callback() and covered_frames < total_frames and log_callback:
+        log_callback(
+            f"⚠️ skip_frames={decoder['skip_frames']}: останні {total_frames - covered_frames} кадрів "
+            f"(після {covered_frames} з {total_frames}) не декодовано, останній сегмент коротший"
+        )
 
-        stitched_img = build_stitched_image(buffer, line_y)
-        class_counts = detect_and_save(model_path, stitched_img, segment_dir, segment_path, segment_idx)
-        all_results.append((segment_idx, class_counts))
+    if len(accumulator):
+        finish_segment(segment_start, is_last=True)
 
     cap.release()
+    inference_queue.close()
+    for worker in inference_workers:
+        worker.join()
+    writers.close()
+    if archive and log_callback:
+        log_callback(writers.stats.summary())
+    if motion_gate and log_callback:
+        log_callback(motion_gate.summary())
+    flush_artifacts(settings)
+    if store is not None:
+        store.flush()
+    all_results.sort(key=lambda item: item[0])
     return all_results
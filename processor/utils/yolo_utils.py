@@ -1,27 +1,68 @@
-from ultralytics import YOLO
-import cv2
 import os
 from collections import Counter
+from .inference_service import get_inference_service
+from .artifact_writer import extract_boxes, get_artifact_writer
 
-def detect_and_save(yolo_model_path, image, output_folder, video_file_name, segment_idx):
-    folder_name = f"{os.path.splitext(video_file_name)[0]}_part{segment_idx}"
-    save_dir = os.path.join(output_folder, folder_name)
-    os.makedirs(save_dir, exist_ok=True)
+# images — [(назва лінії, зображення)] одного сегмента; для типової лінії назва None.
+# Лінії йдуть у модель разом, а лічильники іменованих ліній отримують префікс "лінія/".
+def detect_lines(
+    yolo_model_path, images, output_folder, video_file_name, segment_idx, device=None, settings=None,
+    store=None, segment_info=None, motion_gate=None
+):
+    base_name = os.path.splitext(video_file_name)[0]
+    writer = get_artifact_writer(settings)
+    jobs = []
+    for line_name, image in images:
+        suffix = f"_{line_name}" if line_name else ""
+        save_dir = os.path.join(output_folder, f"{base_name}{suffix}_part{segment_idx}")
+        # segment_info: source, run_id, started_at, start_sec, duration_sec; у бази кожна лінія — окреме джерело
+        line_info = segment_info
+        if line_name and segment_info is not None:
+            line_info = dict(segment_info, source=f"{segment_info['source']}/{line_name}")
 
-    model = YOLO(yolo_model_path)
-    results = model.predict(source=image, save=False, conf=0.3)[0]
+        # 🌙 Без руху на лінії сканування модель не запускається, сегмент отримує нульові лічильники
+        if motion_gate is not None:
+            gated = motion_gate.apply(image, line_name)
+            if gated is None:
+                writer.submit(save_dir, image)
+                if store is not None:
+                    store.add_segment(segment_idx=segment_idx, counts={}, boxes=[], **line_info)
+                print(f"🌙 Без руху, детекцію пропущено: {save_dir}")
+                continue
+            image = gated
+        jobs.append((line_name, save_dir, image, line_info))
 
-    original_path = os.path.join(save_dir, "original.jpg")
-    cv2.imwrite(original_path, image)
+    counts = {}
+    if not jobs:
+        return counts
+    service = get_inference_service(yolo_model_path, device, settings)
+    class_names = service.names
+    for (line_name, save_dir, image, line_info), results in zip(jobs, service.predict_many([job[2] for job in jobs])):
+        # 🔢 Підрахунок класів
+        classes = results.boxes.cls.tolist()
+        class_counts = dict(Counter([class_names[int(cls)] for cls in classes]))
 
-    annotated_image = results.plot()
-    detected_path = os.path.join(save_dir, "detected.jpg")
-    cv2.imwrite(detected_path, annotated_image)
+        # Запис на диск (і малювання рамок) відбувається у фоні
+        boxes = extract_boxes(results, class_names) if store is not None or not writer.annotated else None
+        if writer.annotated:
+            writer.submit(save_dir, image, results=results)
+        else:
+            writer.submit(save_dir, image, boxes=boxes)
 
-    # 🔢 Підрахунок класів
-    class_names = model.names
-    classes = results.boxes.cls.tolist()
-    class_counts = Counter([class_names[int(cls)] for cls in classes])
+        if store is not None:
+            store.add_segment(segment_idx=segment_idx, counts=class_counts, boxes=boxes, **line_info)
 
-    print(f"📁 Збережено результати у {save_dir} | 🔍 Виявлено: {dict(class_counts)}")
-    return dict(class_counts)
+        print(f"📁 Збережено результати у {save_dir} | 🔍 Виявлено: {class_counts}")
+        prefix = f"{line_name}/" if line_name else ""
+        counts.update({prefix + cls: count for cls, count in class_counts.items()})
+    return counts
+
+
+def detect_and_save(
+    yolo_model_path, image, output_folder, video_file_name, segment_idx, device=None, settings=None,
+    store=None, segment_info=None, motion_gate=None
+):
+    return detect_lines(
+        yolo_model_path, [(None, image)], output_folder, video_file_name, segment_idx, device=device,
+        settings=settings, store=store, segment_info=segment_info, motion_gate=motion_gate
+    )
@@ -0,0 +1,157 @@
+# Експорт best.pt в ONNX або OpenVINO для CPU-інференсу, за бажанням з INT8-квантуванням
+# на збережених стічованих зображеннях, і перевірка, що підрахунки збігаються з FP32-моделлю.
+# Запуск з кореня репозиторію:
+#   python -m tools.export_model --model best.pt --format onnx
+#   python -m tools.export_model --model best.pt --format openvino --int8 --images "D:/Traffic project/results"
+import argparse
+import glob
+import os
+import random
+import shutil
+import sys
+from collections import Counter
+import cv2
+from processor.utils.inference_backends import letterbox, load_backend, to_blob
+
+
+# Стічовані зображення, які ArtifactWriter зберігає як <сегмент>/original.<формат>
+def find_images(folder):
+    paths = []
+    for pattern in ("original.jpg", "original.png", "original.webp"):
+        paths += glob.glob(os.path.join(folder, "**", pattern), recursive=True)
+    return sorted(paths)
+
+
+def split_images(paths, calibration_size, validate_size, seed=0):
+    paths = list(paths)
+    random.Random(seed).shuffle(paths)
+    calibration = paths[:calibration_size]
+    validation = paths[calibration_size:calibration_size + validate_size]
+    # Замало зображень для окремої вибірки — перевіряємо на тих самих
+    return calibration, validation or paths[:validate_size]
+
+
+def quantize_onnx(model_path, images, imgsz):
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    source = onnx.load(model_path)
+    input_name = source.graph.input[0].name
+
+    class Reader(CalibrationDataReader):
+        def __init__(self):
+            self._paths = iter(images)
+
+        def get_next(self):
+            path = next(self._paths, None)
+            if path is None:
+                return None
+            return {input_name: to_blob(letterbox(cv2.imread(path), (imgsz, imgsz))[0])}
+
+    output_path = os.path.splitext(model_path)[0] + "_int8.onnx"
+    quantize_static(
+        model_path, output_path, Reader(), quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8, per_channel=True,
+    )
+    # Квантувальник не переносить метадані, а в них імена класів
+    quantized = onnx.load(output_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, output_path)
+    return output_path
+
+
+def quantize_openvino(model_dir, images, imgsz):
+    import nncf
+    import openvino as ov
+
+    xml_path = next(os.path.join(model_dir, f) for f in sorted(os.listdir(model_dir)) if f.endswith(".xml"))
+    model = ov.Core().read_model(xml_path)
+    dataset = nncf.Dataset(images, lambda path: to_blob(letterbox(cv2.imread(path), (imgsz, imgsz))[0]))
+    quantized = nncf.quantize(model, dataset, subset_size=len(images), preset=nncf.QuantizationPreset.MIXED)
+    output_dir = model_dir.rstrip("/\\").replace("_openvino_model", "") + "_int8_openvino_model"
+    os.makedirs(output_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(output_dir, os.path.basename(xml_path)))
+    metadata = os.path.join(model_dir, "metadata.yaml")
+    if os.path.exists(metadata):
+        shutil.copy(metadata, output_dir)
+    return output_dir
+
+
+def count_classes(model, path, conf, imgsz):
+    result = model.predict(source=[cv2.imread(path)], save=False, verbose=False, conf=conf, imgsz=imgsz)[0]
+    return Counter(model.names[int(cls)] for cls in result.boxes.cls.tolist())
+
+
+# Відхилення — сума розбіжностей за класами по всіх зображеннях відносно кількості в FP32
+def compare_counts(reference, candidate, images, conf, imgsz):
+    reference_total = Counter()
+    candidate_total = Counter()
+    mismatched = 0
+    difference = 0
+    for path in images:
+        expected = count_classes(reference, path, conf, imgsz)
+        actual = count_classes(candidate, path, conf, imgsz)
+        reference_total.update(expected)
+        candidate_total.update(actual)
+        diff = sum(abs(expected[cls] - actual[cls]) for cls in set(expected) | set(actual))
+        difference += diff
+        mismatched += bool(diff)
+    relative = difference / max(1, sum(reference_total.values()))
+    return reference_total, candidate_total, mismatched, relative
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Експорт моделі YOLO для CPU-бекендів і перевірка підрахунків")
+    parser.add_argument("--model", required=True, help="шлях до best.pt")
+    parser.add_argument("--format", choices=("onnx", "openvino"), default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="квантувати в INT8 (потрібні --images)")
+    parser.add_argument("--images", help="папка результатів зі збереженими стічованими зображеннями")
+    parser.add_argument("--calibration-size", type=int, default=200)
+    parser.add_argument("--validate-size", type=int, default=100)
+    parser.add_argument("--conf", type=float, default=0.3)
+    parser.add_argument("--tolerance", type=float, default=0.02, help="допустиме відносне відхилення підрахунків")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    images = find_images(args.images) if args.images else []
+    if args.int8 and not images:
+        print(f"❌ Для INT8 потрібні калібрувальні зображення, у {args.images} їх не знайдено")
+        sys.exit(2)
+    calibration, validation = split_images(images, args.calibration_size, args.validate_size)
+
+    reference = YOLO(args.model)
+    print(f"📦 Експорт {args.model} у {args.format}")
+    exported = reference.export(format=args.format, imgsz=args.imgsz, dynamic=False)
+    if args.int8:
+        print(f"🧮 INT8-квантування на {len(calibration)} зображеннях")
+        if args.format == "onnx":
+            exported = quantize_onnx(exported, calibration, args.imgsz)
+        else:
+            exported = quantize_openvino(exported, calibration, args.imgsz)
+    print(f"✅ Модель збережено: {exported}")
+
+    if not validation:
+        print("⚠️ Немає зображень для перевірки (--images), підрахунки не порівнювались")
+        return
+
+    candidate = load_backend(exported)
+    reference_total, candidate_total, mismatched, relative = compare_counts(
+        reference, candidate, validation, args.conf, args.imgsz
+    )
+    for cls in sorted(set(reference_total) | set(candidate_total)):
+        print(f"   {cls}: FP32 {reference_total[cls]}, {os.path.basename(exported)} {candidate_total[cls]}")
+    print(
+        f"📊 Перевірено {len(validation)} зображень: розбіжності на {mismatched}, "
+        f"відхилення {relative * 100:.2f}% (допуск {args.tolerance * 100:.2f}%)"
+    )
+    if relative > args.tolerance:
+        print("❌ Підрахунки експортованої моделі виходять за допуск")
+        sys.exit(1)
+    print("✅ Підрахунки в межах допуску")
+
+
+if __name__ == "__main__":
+    main()
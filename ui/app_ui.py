@@ -1,14 +1,17 @@
 import sys
 import time
 import traceback
+from collections import Counter
+import cv2
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QPushButton, QLabel,
     QFileDialog, QVBoxLayout, QSpinBox, QLineEdit, QMessageBox,
     QTextEdit, QComboBox, QSizePolicy
 )
 from PyQt5.QtCore import QThread, pyqtSignal, QObject
+from PyQt5.QtGui import QImage, QPixmap
 from processor.traffic_processor import TrafficProcessor
-from config_manager import load_config, save_config
+from config_manager import load_config, save_config, build_rtsp_url
 
 
 def run_ui():
@@ -21,12 +24,19 @@ def run_ui():
 class Worker(QObject):
     finished = pyqtSignal()
     log = pyqtSignal(str)
-    result = pyqtSignal(list)
+    segment = pyqtSignal(dict)
+    preview = pyqtSignal(object)
+    result = pyqtSignal(object)
     error = pyqtSignal(str)
 
     def __init__(self, processor):
         super().__init__()
         self.processor = processor
+        # Колбеки викликаються з потоків обробки, тож у UI вони йдуть лише через сигнали
+        # (з'єднання між потоками Qt ставить у чергу подій головного потоку)
+        processor.log_callback = self.log.emit
+        processor.result_callback = self.segment.emit
+        processor.preview_callback = self.preview.emit
 
     def run(self):
         try:
@@ -132,6 +142,15 @@ class TrafficApp(QWidget):
         self.status = QLabel("🟢 Готово до роботи")
         layout.addWidget(self.status)
 
+        self.totals_label = QLabel("")
+        self.totals_label.setWordWrap(True)
+        layout.addWidget(self.totals_label)
+
+        # Зменшена смуга ROI навколо лінії підрахунку (лише коли roi увімкнено)
+        self.preview_label = QLabel()
+        self.preview_label.setVisible(False)
+        layout.addWidget(self.preview_label)
+
         self.log_box = QTextEdit()
         self.log_box.setReadOnly(True)
         self.log_box.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -182,7 +201,6 @@ class TrafficApp(QWidget):
 
     def append_log(self, message):
         self.log_box.append(message)
-        QApplication.processEvents()
 
     def stop_processing(self):
         self.stop_requested = True
@@ -208,11 +226,7 @@ class TrafficApp(QWidget):
                 QMessageBox.warning(self, "⚠️ Помилка", "Введіть RTSP URL!")
                 return
 
-            if username and password and "://" in url:
-                protocol, rest = url.split("://", 1)
-                input_path = f"{protocol}://{username}:{password}@{rest}"
-            else:
-                input_path = url
+            input_path = build_rtsp_url(url, username, password)
         elif source == "screen":
             input_path = "screen"
         else:
@@ -230,6 +244,13 @@ class TrafficApp(QWidget):
 
         self.status.setText("🔄 Обробка...")
         self.log_box.clear()
+        self.totals = Counter()
+        self.segments_done = 0
+        self.video_seconds = 0.0
+        self.started_at = time.time()
+        self.totals_label.setText("")
+        self.preview_label.clear()
+        self.preview_label.setVisible(False)
         self.stop_requested = False
         self.run_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
@@ -256,7 +277,8 @@ class TrafficApp(QWidget):
             segment_length_sec=segment,
             screen_duration_sec=duration,
             source=source,
-            log_callback=self.append_log,
+            device=self.config.get("yolo_device") or None,
+            settings=self.config,
             stop_callback=lambda: self.stop_requested
         )
 
@@ -266,6 +288,8 @@ class TrafficApp(QWidget):
 
         self.worker.result.connect(self.on_processing_result)
         self.worker.log.connect(self.append_log)
+        self.worker.segment.connect(self.on_segment_result)
+        self.worker.preview.connect(self.on_preview)
         self.worker.error.connect(self.on_error)
         self.worker.finished.connect(self.thread.quit)
         self.worker.finished.connect(self.worker.deleteLater)
@@ -274,7 +298,30 @@ class TrafficApp(QWidget):
         self.thread.started.connect(self.worker.run)
         self.thread.start()
 
+    def on_segment_result(self, segment):
+        self.totals.update(segment["counts"])
+        self.segments_done += 1
+        self.video_seconds += segment["duration_sec"]
+        elapsed = max(time.time() - self.started_at, 1e-6)
+        parts = [f"{cls}: {cnt}" for cls, cnt in sorted(self.totals.items())]
+        self.totals_label.setText(
+            f"📊 Разом: {', '.join(parts) or '—'}\n"
+            f"⚡ Сегментів: {self.segments_done}, {self.segments_done * 60 / elapsed:.1f} за хв, "
+            f"швидкість x{self.video_seconds / elapsed:.2f} від реального часу"
+        )
+
+    def on_preview(self, band):
+        rgb = cv2.cvtColor(band, cv2.COLOR_BGR2RGB)
+        height, width = rgb.shape[:2]
+        image = QImage(rgb.data, width, height, rgb.strides[0], QImage.Format_RGB888)
+        # copy() — QImage не тримає посилання на масив numpy
+        self.preview_label.setPixmap(QPixmap.fromImage(image.copy()))
+        self.preview_label.setVisible(True)
+
     def on_processing_result(self, summary):
+        if not isinstance(summary, list):
+            # Камери повертають словник; підсумок уже видно в логах і totals
+            summary = []
         result_lines = []
         for segment_idx, class_counts in summary:
             parts = [f"{cls}: {cnt}" for cls, cnt in class_counts.items()]